@@ -0,0 +1 @@
+"""ベンチマーク（python -m benchmarks.<name> で実行）"""
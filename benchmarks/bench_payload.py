@@ -0,0 +1,111 @@
+"""1回の再実行（rerun）でブラウザに送る画面要素のバイト数
+
+使い方:
+    python -m benchmarks.bench_payload [--config config.json ...]
+
+Streamlitの AppTest でアプリを実行し、描画された要素のprotobufを
+シリアライズしたサイズを合計する（WebSocketで送られるデルタとほぼ同じ大きさ）。
+GASへの送信は接続できないローカルのURLに向け（URANAI_GAS_URL）、GASのスプール・
+購入の記録・ダウンロードのキャッシュは終了時に消す一時ディレクトリに書く
+（本番のスプールに試験用のイベントを残さないため）。
+"""
+import argparse
+import contextlib
+import os
+import shutil
+import tempfile
+import urllib.request
+
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.element_tree import Block
+
+APP_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+CONFIGS = ("config.json", "config_love.json")
+SAMPLE = {"name": "花子", "year": "1990", "month": "1", "day": "1"}
+
+
+# 接続できないURL（送信は失敗し、一時ディレクトリのスプールに入る）
+UNREACHABLE_GAS_URL = "http://127.0.0.1:9/"
+
+
+def _no_network(*args, **kwargs):
+    raise OSError("bench_payload: network disabled")
+
+
+@contextlib.contextmanager
+def isolated_environment():
+    """GASの送信先・スプール・購入の記録・ダウンロードのキャッシュを一時ディレクトリに向ける"""
+    from uranai.gas import get_gas_logger
+
+    tmp = tempfile.mkdtemp(prefix="uranai_bench_")
+    env = {
+        "URANAI_GAS_URL": UNREACHABLE_GAS_URL,
+        "URANAI_GAS_SPOOL_DIR": os.path.join(tmp, "spool"),
+        "URANAI_PURCHASE_DB": os.path.join(tmp, "purchases.sqlite3"),
+        "URANAI_DOCUMENT_CACHE_DIR": os.path.join(tmp, "documents"),
+    }
+    saved = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    urlopen = urllib.request.urlopen
+    urllib.request.urlopen = _no_network
+    try:
+        yield tmp
+    finally:
+        # 送信キューを空にしてから消す（消したあとにスプールを作り直さないように）
+        get_gas_logger(UNREACHABLE_GAS_URL).flush(timeout=30)
+        urllib.request.urlopen = urlopen
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def payload_size(node):
+    """要素ツリー全体の (バイト数, 要素数)"""
+    if isinstance(node, Block):
+        size = count = 0
+        for child in node.children.values():
+            child_size, child_count = payload_size(child)
+            size += child_size
+            count += child_count
+        return size, count
+    proto = getattr(node, "proto", None)
+    return (len(proto.SerializeToString()), 1) if proto is not None else (0, 0)
+
+
+def run_app(query_params, preview_name=None):
+    at = AppTest.from_file(APP_FILE, default_timeout=60)
+    for key, value in query_params.items():
+        at.query_params[key] = value
+    at.run()
+    if preview_name:
+        at.text_input(key="preview_name").input(preview_name)
+        at.button[0].click()
+        at.run()
+    if at.exception:
+        raise RuntimeError(at.exception)
+    return payload_size(at._tree)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="1回の再実行で送る画面要素のバイト数")
+    parser.add_argument("--config", action="append", dest="configs")
+    args = parser.parse_args(argv)
+
+    with isolated_environment():
+        for config_file in args.configs or CONFIGS:
+            query = {"config": config_file}
+            pages = (
+                ("landing", query, None),
+                ("preview", query, SAMPLE["name"]),
+                ("paid", dict(query, paid="true", **SAMPLE), None),
+            )
+            for page, query_params, preview_name in pages:
+                size, count = run_app(query_params, preview_name)
+                print(f"{config_file:20s} {page:8s} {size / 1024:8.1f} KB  {count:3d}要素")
+
+
+if __name__ == "__main__":
+    main()
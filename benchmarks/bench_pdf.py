@@ -0,0 +1,49 @@
+"""鑑定書PDF生成のスループット計測
+
+使い方:
+    python -m benchmarks.bench_pdf [-n 回数] [--config config.json ...]
+"""
+import argparse
+import time
+from datetime import datetime
+
+from uranai.config import get_config
+from uranai.fonts import register_font
+from uranai.pdf import create_pdf
+
+SAMPLE_DIAGNOSIS_INDEX = 0
+
+
+def bench_config(config_file, iterations):
+    loaded = get_config(config_file)
+    today = datetime(2026, 2, 1)
+    diagnosis = None
+    if loaded.mode == "love":
+        diagnosis = loaded.data["results"]["basic"][SAMPLE_DIAGNOSIS_INDEX]
+
+    create_pdf(loaded, "花子", 1990, 1, 1, lp=3, diagnosis_text=diagnosis, today=today)  # ウォームアップ
+    sizes = 0
+    start = time.perf_counter()
+    for i in range(iterations):
+        pdf = create_pdf(loaded, "花子", 1990, 1, 1 + i % 28, lp=1 + i % 9, diagnosis_text=diagnosis, today=today)
+        sizes += len(pdf)
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed, sizes / iterations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="鑑定書PDF生成のベンチマーク")
+    parser.add_argument("-n", "--iterations", type=int, default=50)
+    parser.add_argument("--config", action="append", dest="configs")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    font_name = register_font()
+    print(f"font: {font_name or '(なし・英語フォントで代替)'}  登録 {1000 * (time.perf_counter() - start):.1f} ms（プロセスで1回）")
+    for config_file in args.configs or ["config.json", "config_love.json"]:
+        rate, avg_size = bench_config(config_file, args.iterations)
+        print(f"{config_file:20s} {rate:8.1f} PDFs/sec  平均 {avg_size / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
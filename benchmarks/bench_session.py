@@ -0,0 +1,63 @@
+"""1セッションあたりのセッションステートのメモリ使用量
+
+使い方:
+    python -m benchmarks.bench_session [--config config.json ...]
+
+決済後の画面（鑑定結果の表示まで）を AppTest で実行し、セッション
+ステートに残った値ごとのおおよそのメモリ量（参照先を含む）を表示する。
+設定オブジェクトなどプロセスで共有されるものは数えない。
+GASのスプール・購入の記録・ダウンロードのキャッシュは一時ディレクトリに書く
+（bench_payload.isolated_environment）。
+"""
+import argparse
+import sys
+
+from benchmarks.bench_payload import APP_FILE, SAMPLE, isolated_environment
+from streamlit.testing.v1 import AppTest
+
+from uranai.config import LoadedConfig
+
+CONFIGS = ("config.json", "config_love.json")
+
+
+def deep_sizeof(obj, seen=None):
+    """obj と、そこから参照されるオブジェクトの sys.getsizeof の合計"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, LoadedConfig):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    return size
+
+
+def session_footprint(query_params):
+    at = AppTest.from_file(APP_FILE, default_timeout=60)
+    for key, value in query_params.items():
+        at.query_params[key] = value
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception)
+    # ユーザーが設定した値とウィジェットの値（Streamlit内部のキーを除く）
+    state = at.session_state._state._state.filtered_state
+    return {key: deep_sizeof(value) for key, value in state.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="1セッションあたりのセッションステートのメモリ使用量")
+    parser.add_argument("--config", action="append", dest="configs")
+    args = parser.parse_args(argv)
+
+    with isolated_environment():
+        for config_file in args.configs or CONFIGS:
+            sizes = session_footprint(dict(SAMPLE, config=config_file, paid="true"))
+            print(f"{config_file}: 合計 {sum(sizes.values()) / 1024:.1f} KB")
+            for key, size in sorted(sizes.items(), key=lambda item: -item[1]):
+                print(f"  {key:28s} {size:10,d} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""起動時間（コールドスタート）の内訳
+
+使い方:
+    python -m benchmarks.bench_startup [--config config.json] [--top 15]
+
+新しいプロセスで、app.py が先頭で読み込むモジュールごとの読み込み時間
+（python -X importtime）と、トップページ・決済後ページを初めて表示するまでの
+時間、app.py が記録した起動時の段階（imports・config_load・font_check・
+first_render_*、uranai.metrics.record_phase）を表示する。Streamlit本体は
+サーバーが先に読み込んでいるため数えない。重いライブラリ（reportlab など）が
+トップページの表示で読み込まれていないことも確認できる。
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_payload import APP_FILE, SAMPLE
+
+# トップページの表示では読み込まれないはずの重いライブラリ
+HEAVY_MODULES = ("reportlab", "numpy", "fontTools", "sqlite3")
+_MARKER = "--bench-startup--"
+
+
+def app_imports(app_file=APP_FILE):
+    """app.py が先頭レベルで読み込むモジュール名（書かれている順）"""
+    with open(app_file, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), app_file)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def import_profile(modules):
+    """新しいプロセスで modules を読み込み、(モジュール名, 自身のμs, 累計のμs, 深さ) の一覧を返す"""
+    code = "\n".join(["import streamlit", f"import sys; sys.stderr.write({_MARKER!r} + '\\n')"]
+                     + [f"import {module}" for module in modules if module != "streamlit"])
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True,
+                            text=True, cwd=os.path.dirname(APP_FILE), check=True)
+    rows = []
+    lines = result.stderr.splitlines()
+    for line in lines[lines.index(_MARKER) + 1:]:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us), (len(name) - len(name.lstrip()) - 1) // 2))
+    return rows
+
+
+def _first_render_child(config_file):
+    """（子プロセス）トップページ・決済後ページを初めて表示するまでの時間を JSON で出力する"""
+    import streamlit  # noqa: F401
+    from streamlit.testing.v1 import AppTest
+
+    from uranai.metrics import startup_phases
+
+    report = {}
+    for page, query in (("landing", {"config": config_file}),
+                        ("paid", dict(SAMPLE, config=config_file, paid="true"))):
+        at = AppTest.from_file(APP_FILE, default_timeout=60)
+        for key, value in query.items():
+            at.query_params[key] = value
+        start = time.perf_counter()
+        at.run()
+        report[page] = time.perf_counter() - start
+        report[f"{page}_heavy_modules"] = [m for m in HEAVY_MODULES if m in sys.modules]
+    report["phases"] = startup_phases()
+    print(json.dumps(report))
+    sys.stdout.flush()
+    # GASへの送信キューの終了待ち（atexit）をしない
+    os._exit(0)
+
+
+def first_render_profile(config_file):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, URANAI_PURCHASE_DB=os.path.join(tmp, "purchases.sqlite3"),
+                   URANAI_DOCUMENT_CACHE_DIR=os.path.join(tmp, "documents"), URANAI_GAS_URL="http://127.0.0.1:9/",
+                   URANAI_GAS_SPOOL_DIR=os.path.join(tmp, "spool"))
+        result = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child", config_file],
+                                capture_output=True, text=True, cwd=os.path.dirname(APP_FILE), env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="起動時間（コールドスタート）の内訳")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--top", type=int, default=15, help="表示するモジュール数")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        _first_render_child(args.child)
+
+    rows = import_profile(app_imports())
+    total = sum(cumulative_us for _, _, cumulative_us, depth in rows if depth == 0)
+    print(f"app.py のモジュール読み込み: 合計 {total / 1000:.1f}ms")
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda row: -row[2])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f}ms（自身 {self_us / 1000:6.1f}ms）  {name}")
+
+    report = first_render_profile(args.config)
+    print(f"初回表示（{args.config}）:")
+    for page in ("landing", "paid"):
+        heavy = ", ".join(report[f"{page}_heavy_modules"]) or "なし"
+        print(f"  {page:8s} {report[page] * 1000:8.1f}ms  読み込まれた重いライブラリ: {heavy}")
+    print("起動時の段階（プロセスで初回のみ）:")
+    for phase, seconds in report["phases"].items():
+        print(f"  {phase:22s} {seconds * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""日本語折り返し（uranai.wrap）の計測
+
+キャンバスを使わず、従来の「1文字ごとに行全体の幅を測り直す」方式と
+送り幅キャッシュによる線形時間の方式を比較する。
+
+使い方:
+    python -m benchmarks.bench_wrap [-n 回数] [--repeat 段落を連結する回数]
+"""
+import argparse
+import time
+
+from reportlab.pdfbase import pdfmetrics
+
+from uranai.config import get_config
+from uranai.fonts import pdf_font_name
+from uranai.pdf import CONTENT_WIDTH, BODY_SIZE
+from uranai.wrap import glyph_widths, wrap_paragraph
+
+
+def naive_wrap(text, font_name, font_size, max_width):
+    """従来の実装（行の長さに対して二乗）"""
+    lines, current_line = [], ""
+    for char in text:
+        if pdfmetrics.stringWidth(current_line + char, font_name, font_size) <= max_width: current_line += char
+        else: lines.append(current_line); current_line = char
+    if current_line: lines.append(current_line)
+    return lines
+
+
+def love_paragraphs(config_file="config_love.json"):
+    """config_love.json の診断結果から改行を除いた長い段落を取り出す"""
+    results = get_config(config_file).data.get("results", {})
+    return ["".join(text.split("\n")) for course in results.values() for text in course]
+
+
+def timed(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="日本語折り返しのベンチマーク")
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    parser.add_argument("--repeat", type=int, action="append", help="段落を連結する回数（複数指定可）")
+    args = parser.parse_args(argv)
+
+    font_name = pdf_font_name()
+    paragraphs = love_paragraphs()
+    # 幅の広い領域（1行が長い）ほど従来方式との差が大きくなる
+    for max_width in (CONTENT_WIDTH, CONTENT_WIDTH * 8):
+        for repeat in args.repeat or [1, 4, 16]:
+            text = "".join(paragraphs) * repeat
+            widths = glyph_widths(font_name, BODY_SIZE)
+            linear = timed(lambda: wrap_paragraph(text, max_width, widths), args.iterations)
+            naive = timed(lambda: naive_wrap(text, font_name, BODY_SIZE, max_width), max(1, args.iterations // 10))
+            print(f"width={max_width:6.0f} chars={len(text):7d}  linear {linear * 1000:8.2f} ms"
+                  f"  naive {naive * 1000:9.2f} ms  x{naive / linear:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""同時セッションの負荷試験（AppTest）
+
+使い方:
+    python -m benchmarks.load_test [--users 20] [--rounds 3] [--config config.json ...]
+
+仮想ユーザーごとに1つのスレッドで、次の流れを rounds 回繰り返す:
+    landing   トップページの表示
+    preview   無料プレビューのフォーム送信
+    pay       決済前フォーム（pay）の送信
+    paid      決済後のリダイレクト（paid=true&name=...&session_id=...）の表示
+
+すべてのセッションが同じプロセスで動くため、1台のサーバー（dyno）で同時に
+処理する場合に近い。AppTest はプロセス共通の Runtime を差し替えて実行するため
+再実行は1つずつ順に行う（再実行はCPU処理が中心で、実際のサーバーでもGILにより
+ほぼ順に処理される）。所要時間には順番待ちの時間も含む。GASへの送信はローカルの
+スタブサーバーに向け（URANAI_GAS_URL）、GASのスプール・購入の記録・ダウンロードの
+キャッシュは一時ディレクトリに書く（URANAI_GAS_SPOOL_DIR・URANAI_PURCHASE_DB・
+URANAI_DOCUMENT_CACHE_DIR）。本番のスプールを再送してしまわないようにするため。ブラウザとのWebSocket通信は含まない。
+
+結果として、段階ごとの再実行の所要時間（待ち時間込みの p50/p95/p99 と、実行だけの
+平均）、全体のスループット、セッション1つあたりのRSSの増加量（AppTest自身が保持する要素ツリーを含む）、スタブが受け取った
+GASイベント数を表示する。
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.bench_payload import APP_FILE, SAMPLE
+from streamlit.testing.v1 import AppTest
+
+from uranai.gas import get_gas_logger
+
+CONFIGS = ("config.json", "config_love.json")
+STEPS = ("landing", "preview", "pay", "paid")
+
+
+# ==========================================
+# GASのスタブ
+# ==========================================
+class GasStub:
+    """受け取ったPOSTとイベントを数えるだけのGAS代わりのサーバー"""
+
+    def __init__(self):
+        stub = self
+        self.posts = 0
+        self.events = 0
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub._lock:
+                    stub.posts += 1
+                    stub.events += len(body.get("events", [body]))
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_port}/exec"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+
+
+# ==========================================
+# 仮想ユーザー
+# ==========================================
+def rss_bytes():
+    """現在のRSS（Linuxは /proc、それ以外は最大RSS）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# AppTest の実行はプロセスで同時に1つだけ
+_run_lock = threading.Lock()
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}   # (config, step) → [(待ち時間込みの秒数, 実行だけの秒数), ...]
+        self._lock = threading.Lock()
+
+    def timed(self, config_file, step, run):
+        start = time.perf_counter()
+        with _run_lock:
+            run_start = time.perf_counter()
+            at = run()
+        end = time.perf_counter()
+        if at.exception:
+            raise RuntimeError(f"{config_file} {step}: {at.exception[0].message}")
+        with self._lock:
+            self.samples.setdefault((config_file, step), []).append((end - start, end - run_start))
+        return at
+
+
+_session_ids = itertools.count(1)
+
+
+def user_flow(recorder, config_file, rounds, sessions):
+    """1人分の操作を rounds 回繰り返す（AppTestは最後まで保持してセッションとして数える）"""
+    for _ in range(rounds):
+        at = AppTest.from_file(APP_FILE, default_timeout=60)
+        at.query_params["config"] = config_file
+        recorder.timed(config_file, "landing", at.run)
+
+        at.text_input(key="preview_name").input(SAMPLE["name"])
+        at.button[0].click()
+        recorder.timed(config_file, "preview", at.run)
+
+        at.text_input(key="p_name").input(SAMPLE["name"])
+        at.button[1].click()
+        recorder.timed(config_file, "pay", at.run)
+        sessions.append(at)
+
+        paid = AppTest.from_file(APP_FILE, default_timeout=60)
+        query = dict(SAMPLE, config=config_file, paid="true", session_id=f"cs_load_{next(_session_ids)}")
+        for key, value in query.items():
+            paid.query_params[key] = value
+        recorder.timed(config_file, "paid", paid.run)
+        sessions.append(paid)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="同時セッションの負荷試験")
+    parser.add_argument("--users", type=int, default=20, help="同時に動かす仮想ユーザー数")
+    parser.add_argument("--rounds", type=int, default=3, help="1人あたりの繰り返し回数")
+    parser.add_argument("--config", action="append", dest="configs")
+    args = parser.parse_args(argv)
+    configs = args.configs or CONFIGS
+
+    db_dir = tempfile.mkdtemp(prefix="uranai_load_")
+    os.environ["URANAI_GAS_SPOOL_DIR"] = os.path.join(db_dir, "spool")
+    stub = GasStub()
+    os.environ["URANAI_GAS_URL"] = stub.url
+    os.environ["URANAI_PURCHASE_DB"] = os.path.join(db_dir, "purchases.sqlite3")
+    os.environ["URANAI_DOCUMENT_CACHE_DIR"] = os.path.join(db_dir, "documents")
+
+    # 1回目の読み込み（モジュール・フォント・設定）は計測から外す
+    for config_file in configs:
+        user_flow(Recorder(), config_file, 1, [])
+
+    recorder = Recorder()
+    sessions = []
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        futures = [pool.submit(user_flow, recorder, configs[i % len(configs)], args.rounds, sessions)
+                   for i in range(args.users)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+    rss_after = rss_bytes()
+
+    get_gas_logger(stub.url).flush(timeout=10)
+
+    reruns = sum(len(values) for values in recorder.samples.values())
+    print(f"仮想ユーザー {args.users}人 × {args.rounds}回  経過 {elapsed:.1f}秒  "
+          f"再実行 {reruns}回（{reruns / elapsed:.1f}回/秒）")
+    print(f"{'config':20s} {'step':8s} {'n':>5s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'max ms':>8s} "
+          f"{'実行 ms':>8s}")
+    for config_file in configs:
+        for step in STEPS:
+            samples = recorder.samples.get((config_file, step))
+            if not samples:
+                continue
+            values = [total for total, _ in samples]
+            print(f"{config_file:20s} {step:8s} {len(values):5d} {statistics.median(values) * 1000:8.1f} "
+                  f"{percentile(values, 0.95) * 1000:8.1f} {percentile(values, 0.99) * 1000:8.1f} "
+                  f"{max(values) * 1000:8.1f} {statistics.mean(run for _, run in samples) * 1000:8.1f}")
+    print(f"RSS {rss_before / 2**20:.1f} MB → {rss_after / 2**20:.1f} MB  "
+          f"（セッション{len(sessions)}個、1つあたり {(rss_after - rss_before) / max(len(sessions), 1) / 1024:.1f} KB）")
+    print(f"GASスタブ: POST {stub.posts}回・イベント {stub.events}件")
+    stub.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""鑑定フローのホットパスのベンチマーク
+
+使い方:
+    python -m benchmarks                          # すべて計測
+    python -m benchmarks -k love                  # 名前に love を含むものだけ
+    python -m benchmarks --save baseline.json     # 結果を保存
+    python -m benchmarks --compare baseline.json  # 保存した結果と比較
+
+各ケースは1サンプルあたり数十マイクロ秒以上になるよう内部で呼び出し回数を
+調整し、サンプルごとの1回あたりの時間から ops/sec・p50・p99 を求める。
+
+full_text は日付ごとのキャッシュ（uranai.cache）を通さずに計算そのものを計測する
+（以前のベースラインと比較できるように）。キャッシュから返す場合の時間は
+full_text_cached で計測する。
+"""
+import argparse
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from uranai.config import get_config, parse_config
+from uranai.fortune import get_fortune_data
+from uranai.love import get_love_diagnosis_result
+from uranai.numerology import calculate_life_path_number, life_path_numbers, lookup_life_path_number
+from uranai.reading import _compute_reading, compute_reading, reading_pdf
+
+CONFIG_FILES = ("config.json", "config_love.json")
+SAMPLE_NAME = "花子"
+SAMPLE_TODAY = datetime(2026, 2, 1)
+MIN_SAMPLE_NS = 50_000
+
+
+def _dates(n=512):
+    """計測用の生年月日（1900〜2025年から均等に選ぶ）"""
+    return [(1900 + i * 7 % 126, 1 + i % 12, 1 + i * 5 % 28) for i in range(n)]
+
+
+def _cycler(values):
+    """呼び出しごとに values を順番に返す関数"""
+    state = {"i": 0}
+
+    def next_value():
+        i = state["i"] = (state["i"] + 1) % len(values)
+        return values[i]
+    return next_value
+
+
+# ==========================================
+# 計測ケース
+# ==========================================
+def build_cases():
+    """(名前, 引数なし関数) のリストを返す"""
+    cases = []
+    next_date = _cycler(_dates())
+
+    def life_path():
+        calculate_life_path_number(*next_date())
+    cases.append(("calculate_life_path_number", life_path))
+
+    def life_path_lookup():
+        lookup_life_path_number(*next_date())
+    cases.append(("lookup_life_path_number", life_path_lookup))
+
+    years, months, days = zip(*_dates())
+    cases.append(("life_path_numbers[512]", lambda: life_path_numbers(years, months, days)))
+
+    for config_file in CONFIG_FILES:
+        loaded = get_config(config_file)
+        with open(config_file, "rb") as f:
+            raw = f.read()
+
+        cases.append((f"load_config[{config_file}]", lambda config_file=config_file: get_config(config_file)))
+        cases.append((f"parse_config[{config_file}]",
+                      lambda config_file=config_file, raw=raw: parse_config(config_file, raw, 0)))
+
+        next_lp = _cycler([calculate_life_path_number(*d) for d in _dates()])
+        cases.append((f"get_fortune_data[{config_file}]",
+                      lambda loaded=loaded, next_lp=next_lp: get_fortune_data(loaded, next_lp())))
+
+        def love(loaded=loaded, next_date=_cycler(_dates())):
+            get_love_diagnosis_result(loaded, SAMPLE_NAME, *next_date(), "basic", SAMPLE_TODAY)
+        cases.append((f"get_love_diagnosis_result[{config_file}]", love))
+
+        def full_text(loaded=loaded, next_date=_cycler(_dates())):
+            _compute_reading(loaded, SAMPLE_NAME, *next_date(), SAMPLE_TODAY)
+        cases.append((f"full_text[{config_file}]", full_text))
+
+        def full_text_cached(loaded=loaded, next_date=_cycler(_dates())):
+            compute_reading(loaded, SAMPLE_NAME, *next_date(), today=SAMPLE_TODAY)
+        cases.append((f"full_text_cached[{config_file}]", full_text_cached))
+
+        reading = compute_reading(loaded, SAMPLE_NAME, 1990, 1, 1, today=SAMPLE_TODAY)
+        cases.append((f"create_pdf[{config_file}]",
+                      lambda loaded=loaded, reading=reading: reading_pdf(loaded, reading)))
+
+    cases.append(("draw_wrapped_text", _wrapped_text_case()))
+    return cases
+
+
+def _wrapped_text_case():
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    from uranai.fonts import pdf_font_name
+    from uranai.pdf import BODY_LEADING, BODY_SIZE, CONTENT_WIDTH, MARGIN_X, draw_wrapped_text
+
+    font_name = pdf_font_name()
+    results = get_config("config_love.json").data.get("results", {})
+    text = "".join("".join(t.split("\n")) for course in results.values() for t in course)[:2000]
+
+    def run():
+        # 1ページ分を超えた行は描画されない（y < 30 で打ち切り）が、折り返しは全文に対して行われる
+        c = canvas.Canvas(io.BytesIO(), pagesize=A4)
+        draw_wrapped_text(c, text, MARGIN_X, A4[1] - 60, CONTENT_WIDTH, font_name, BODY_SIZE, BODY_LEADING)
+    return run
+
+
+# ==========================================
+# 計測
+# ==========================================
+def measure(fn, seconds):
+    """fn の1回あたりの時間（ns）のサンプルを集める"""
+    fn()
+    loops = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= MIN_SAMPLE_NS:
+            break
+        loops *= 2
+
+    samples = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline or len(samples) < 5:
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter_ns() - start) / loops)
+    return samples
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    p99_index = min(len(samples) - 1, int(len(samples) * 0.99))
+    mean = statistics.fmean(samples)
+    return {
+        "ops_per_sec": 1e9 / mean,
+        "p50_us": samples[len(samples) // 2] / 1000,
+        "p99_us": samples[p99_index] / 1000,
+        "samples": len(samples),
+    }
+
+
+def run(keyword=None, seconds=0.5):
+    results = {}
+    for name, fn in build_cases():
+        if keyword and keyword not in name:
+            continue
+        results[name] = summarize(measure(fn, seconds))
+        yield name, results[name]
+
+
+def format_row(name, result, baseline=None):
+    row = (f"{name:48s} {result['ops_per_sec']:14,.0f} ops/s"
+           f"  p50 {result['p50_us']:10.2f} µs  p99 {result['p99_us']:10.2f} µs")
+    if baseline:
+        ratio = result["ops_per_sec"] / baseline["ops_per_sec"]
+        row += f"  x{ratio:5.2f}"
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="鑑定フローのベンチマーク")
+    parser.add_argument("-k", dest="keyword", help="名前にこの文字列を含むケースだけ計測する")
+    parser.add_argument("-t", "--time", type=float, default=0.5, help="1ケースあたりの計測秒数")
+    parser.add_argument("--save", metavar="FILE", help="結果をJSONで保存する")
+    parser.add_argument("--compare", metavar="FILE", help="保存済みの結果（ベースライン）と比較する")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="ベースラインより ops/s がこの割合以上落ちたケースがあれば終了コード1（例: 0.2）")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    regressions = []
+    for name, result in run(args.keyword, args.time):
+        results[name] = result
+        base = baseline.get(name)
+        print(format_row(name, result, base), flush=True)
+        if base and args.max_regression is not None:
+            if result["ops_per_sec"] < base["ops_per_sec"] * (1 - args.max_regression):
+                regressions.append(name)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, ensure_ascii=False, indent=2)
+    if regressions:
+        print(f"性能が低下したケース: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
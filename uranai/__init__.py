@@ -0,0 +1,27 @@
+"""占いアプリのコアロジック（Streamlitに依存しないモジュール群）
+
+どの関数も読み込み済みの設定（LoadedConfig）を引数で受け取り、
+モジュールのグローバル状態に依存しない。Streamlit（app.py）のほか、
+一括発行・ベンチマーク・APIなどから同じように呼び出せる。
+
+    from uranai import get_config, compute_preview, compute_reading
+
+    loaded = get_config("config_love.json")
+    preview = compute_preview(loaded, "花子", 1990, 1, 1)
+
+PDF生成（reportlab）は reading_pdf() を呼んだときにだけ読み込まれる。
+"""
+from uranai.config import (CONFIG_MAP, ConfigError, ConfigNotFoundError, LoadedConfig, get_config,
+                           resolve_config_file)
+from uranai.fortune import get_fortune_data, get_monthly_fortunes
+from uranai.love import get_love_diagnosis_result
+from uranai.numerology import calculate_life_path_number, life_path_numbers, lookup_life_path_number
+from uranai.preview import Preview, compute_preview
+from uranai.reading import Reading, compute_reading, reading_pdf
+
+__all__ = [
+    "CONFIG_MAP", "ConfigError", "ConfigNotFoundError", "LoadedConfig", "get_config", "resolve_config_file",
+    "get_fortune_data", "get_monthly_fortunes", "get_love_diagnosis_result", "calculate_life_path_number",
+    "life_path_numbers", "lookup_life_path_number",
+    "Preview", "compute_preview", "Reading", "compute_reading", "reading_pdf",
+]
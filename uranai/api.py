@@ -0,0 +1,296 @@
+"""鑑定結果のJSON API（ASGI）
+
+WordPressのページからStreamlitのセッションを使わずにプレビュー・鑑定結果を
+取得するための、状態を持たない軽量なAPI。フレームワークには依存しない。
+
+起動:
+    uvicorn uranai.api:app --workers 4 --port 8000
+
+エンドポイント（GET のクエリ文字列、または POST のJSONで指定）:
+    /api/preview  config, name, year, month, day  → 無料プレビュー
+    /api/reading  config, name, year, month, day  → 鑑定結果（全文）
+    /api/compatibility  config, members（[{name, year, month, day}, ...]）, limit
+                                                   → グループ全員の相性の行列と上位の組
+    /healthz                                       → 稼働確認・キャッシュの統計
+    /metrics                                       → メトリクス（Prometheus テキスト形式）
+
+/api/reading は有料の内容を返すため、環境変数 URANAI_API_TOKEN を設定し、
+リクエストに "Authorization: Bearer <トークン>" を付けた場合だけ応答する。
+ブラウザからの呼び出しを許可するオリジンは URANAI_API_ALLOWED_ORIGINS
+（カンマ区切り、既定は "*"）で指定する。
+"""
+import hmac
+import json
+import logging
+import os
+from urllib.parse import parse_qsl
+
+from uranai.cache import cache_stats
+from uranai.config import CONFIG_MAP, DEFAULT_CONFIG_FILE, ConfigError, get_config
+from uranai.gas import save_data_via_gas
+from uranai.metrics import metrics
+from uranai.preview import compute_preview
+from uranai.reading import compute_reading
+
+logger = logging.getLogger(__name__)
+
+# 入力の範囲はStreamlitのフォームと同じ
+YEAR_RANGE = (1900, 2025)
+MONTH_RANGE = (1, 12)
+DAY_RANGE = (1, 31)
+MAX_NAME_LENGTH = 50
+MAX_BODY_BYTES = 16 * 1024
+# /api/compatibility の人数（それ以上は python -m uranai.compatibility で）
+MAX_GROUP_MEMBERS = 100
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ==========================================
+# 入力の検証
+# ==========================================
+def _str_param(params, key):
+    """文字列の値（POSTのJSONで文字列以外が来たら 400）"""
+    value = params.get(key, "")
+    if not isinstance(value, str):
+        raise ApiError(400, f"{key} は文字列で指定してください")
+    return value
+
+
+def _config_for(params):
+    """config パラメータから設定を取得する（CONFIG_MAPにある設定だけを許可）"""
+    config_param = _str_param(params, "config") or "default"
+    if config_param in CONFIG_MAP:
+        config_file = CONFIG_MAP[config_param]
+    elif config_param in CONFIG_MAP.values():
+        config_file = config_param
+    else:
+        raise ApiError(400, f"不明な config です: {config_param}")
+    try:
+        return get_config(config_file)
+    except ConfigError as e:
+        if config_file == DEFAULT_CONFIG_FILE:
+            raise ApiError(500, e.message)
+        raise ApiError(404, f"設定ファイルが見つかりません: {config_param}")
+
+
+def _int_param(params, key, value_range):
+    value = params.get(key, "")
+    # POSTのJSONでは整数か文字列だけを受け付ける（true や 1.5 は不可）
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ApiError(400, f"{key} は整数で指定してください")
+    try:
+        value = int(value)
+    except ValueError:
+        raise ApiError(400, f"{key} は整数で指定してください")
+    if not value_range[0] <= value <= value_range[1]:
+        raise ApiError(400, f"{key} は {value_range[0]}〜{value_range[1]} で指定してください")
+    return value
+
+
+def parse_person(params):
+    """リクエストから (name, year, month, day) を取り出す"""
+    name = _str_param(params, "name").strip()
+    if not name:
+        raise ApiError(400, "お名前を入力してください")
+    if len(name) > MAX_NAME_LENGTH:
+        raise ApiError(400, f"お名前は{MAX_NAME_LENGTH}文字以内で入力してください")
+    return (name, _int_param(params, "year", YEAR_RANGE), _int_param(params, "month", MONTH_RANGE),
+            _int_param(params, "day", DAY_RANGE))
+
+
+# ==========================================
+# エンドポイント
+# ==========================================
+def preview_to_dict(preview):
+    data = {"mode": preview.mode, "title": preview.title}
+    if preview.mode == "love":
+        data["text"] = preview.text
+    else:
+        data.update(
+            lp=preview.lp,
+            lp_label=preview.lp_label,
+            subtitle=preview.subtitle,
+            overall={"label": preview.overall_label, **preview.overall._asdict()},
+            love={"label": preview.love_label, **preview.love._asdict()},
+        )
+    return data
+
+
+def handle_preview(params, headers):
+    loaded = _config_for(params)
+    name, year, month, day = parse_person(params)
+    with metrics.span("preview", mode=loaded.mode):
+        preview = compute_preview(loaded, name, year, month, day)
+    save_data_via_gas(loaded, "無料プレビュー", name, year, month, day, preview.log_lp)
+    metrics.inc("uranai_previews_total", mode=loaded.mode, source="api")
+    return 200, preview_to_dict(preview)
+
+
+def _check_token(headers):
+    token = os.environ.get("URANAI_API_TOKEN", "")
+    if not token:
+        raise ApiError(403, "このエンドポイントは無効です（URANAI_API_TOKEN が未設定）")
+    supplied = headers.get("authorization", "")
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+        raise ApiError(401, "認証が必要です")
+
+
+def handle_reading(params, headers):
+    _check_token(headers)
+    loaded = _config_for(params)
+    name, year, month, day = parse_person(params)
+    with metrics.span("reading", mode=loaded.mode):
+        reading = compute_reading(loaded, name, year, month, day)
+    return 200, {
+        "mode": loaded.mode,
+        "name": name,
+        "birth_date": f"{year:04d}-{month:02d}-{day:02d}",
+        "date": reading.today.strftime("%Y-%m-%d"),
+        "lp": reading.lp,
+        "text": reading.text,
+    }
+
+
+def handle_compatibility(params, headers):
+    # NumPyを使うため、呼ばれたときに読み込む
+    from uranai.compatibility import DEFAULT_RANKING_LIMIT, group_compatibility
+
+    loaded = _config_for(params)
+    if "compatibility" not in loaded.data:
+        raise ApiError(404, "この設定には相性表（compatibility）がありません")
+    members = params.get("members")
+    if not isinstance(members, list) or len(members) < 2:
+        raise ApiError(400, "members に2人以上の {name, year, month, day} を指定してください（POST のJSON）")
+    if len(members) > MAX_GROUP_MEMBERS:
+        raise ApiError(400, f"members は{MAX_GROUP_MEMBERS}人以内で指定してください")
+    people = []
+    for member in members:
+        if not isinstance(member, dict):
+            raise ApiError(400, "members の各要素はオブジェクトで指定してください")
+        people.append(parse_person(member))
+    limit = _int_param(params, "limit", (1, DEFAULT_RANKING_LIMIT)) if "limit" in params else DEFAULT_RANKING_LIMIT
+    with metrics.span("compatibility"):
+        result = group_compatibility(loaded, people, limit)
+    return 200, {
+        "members": [{"name": name, "lp": lp} for name, lp in zip(result.names, result.life_path_numbers.tolist())],
+        "matrix": result.matrix.tolist(),
+        "ranking": [pair._asdict() for pair in result.ranking],
+        "pair_count": result.pair_count,
+    }
+
+
+def handle_health(params, headers):
+    return 200, {"status": "ok", "cache": cache_stats()}
+
+
+def handle_metrics(params, headers):
+    # 文字列を返すとテキストとして送る
+    return 200, metrics.render_prometheus()
+
+
+ROUTES = {
+    "/api/preview": handle_preview,
+    "/api/reading": handle_reading,
+    "/api/compatibility": handle_compatibility,
+    "/healthz": handle_health,
+    "/metrics": handle_metrics,
+}
+
+
+# ==========================================
+# ASGIアプリ
+# ==========================================
+def _allowed_origin(origin):
+    allowed = [o.strip() for o in os.environ.get("URANAI_API_ALLOWED_ORIGINS", "*").split(",") if o.strip()]
+    if "*" in allowed:
+        return "*"
+    return origin if origin in allowed else None
+
+
+async def _read_body(receive):
+    body = b""
+    more = True
+    while more:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            raise ApiError(413, "リクエストが大きすぎます")
+        more = message.get("more_body", False)
+    return body
+
+
+async def _send_json(send, status, payload, origin=None):
+    # 204 にはボディを付けない。payload が文字列のとき（/metrics）はテキストで送る
+    if isinstance(payload, str):
+        body, content_type = payload.encode("utf-8"), b"text/plain; version=0.0.4; charset=utf-8"
+    else:
+        body = b"" if status == 204 else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        content_type = b"application/json; charset=utf-8"
+    headers = [
+        (b"content-type", content_type),
+        (b"content-length", str(len(body)).encode()),
+        (b"cache-control", b"no-store"),
+    ]
+    if origin:
+        headers += [
+            (b"access-control-allow-origin", origin.encode()),
+            (b"access-control-allow-headers", b"authorization, content-type"),
+            (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+            (b"vary", b"origin"),
+        ]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+    origin = _allowed_origin(headers.get("origin", ""))
+    method = scope["method"]
+    if method == "OPTIONS":
+        await _send_json(send, 204 if origin else 403, {"error": "許可されていないオリジンです"}, origin)
+        return
+
+    try:
+        handler = ROUTES.get(scope["path"])
+        if handler is None:
+            raise ApiError(404, "見つかりません")
+        if method not in ("GET", "POST"):
+            raise ApiError(405, "GET または POST で呼び出してください")
+        params = dict(parse_qsl(scope.get("query_string", b"").decode("utf-8", "replace")))
+        if method == "POST":
+            body = await _read_body(receive)
+            if body:
+                try:
+                    posted = json.loads(body)
+                except ValueError:
+                    raise ApiError(400, "JSONの形式が正しくありません")
+                if not isinstance(posted, dict):
+                    raise ApiError(400, "JSONオブジェクトで指定してください")
+                params.update(posted)
+        with metrics.span("api", path=scope["path"]):
+            status, payload = handler(params, headers)
+    except ApiError as e:
+        status, payload = e.status, {"error": e.message}
+    except Exception:
+        logger.exception("APIの処理中にエラーが発生しました")
+        metrics.inc("uranai_errors_total", stage="api")
+        status, payload = 500, {"error": "内部エラーが発生しました"}
+    metrics.inc("uranai_api_requests_total", path=scope["path"] if handler else "other", status=status)
+    await _send_json(send, status, payload, origin)
@@ -0,0 +1,196 @@
+"""CSVからの一括鑑定書発行（法人・イベント向け）
+
+使い方:
+    python -m uranai.batch members.csv -o out/ [--config config_love.json]
+                           [--format txt|pdf] [--jobs 4] [--date 2026-02-01]
+
+CSVの1行目はヘッダーで、次のどちらかの形式に対応する：
+    name,year,month,day
+    name,birth_date          （birth_date は 1990-01-31 / 1990/01/31）
+（列名は「お名前」「年」「月」「日」「生年月日」でも可）
+
+入力は1行ずつ読みながら一定数ずつワーカープロセスに渡すため、
+ファイル全体をメモリに載せない。結果は1人1ファイルで出力先に書き出し、
+読み込めなかった行は errors.csv に記録する。
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime
+
+from uranai.config import DEFAULT_CONFIG_FILE, get_config
+
+FORMATS = ("txt", "pdf")
+COLUMN_ALIASES = {
+    "name": ("name", "お名前", "名前"),
+    "year": ("year", "年"),
+    "month": ("month", "月"),
+    "day": ("day", "日"),
+    "birth_date": ("birth_date", "dob", "生年月日"),
+}
+_UNSAFE_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+class RowError(ValueError):
+    """CSVの行が読み込めない"""
+
+
+def _column(row, key):
+    for alias in COLUMN_ALIASES[key]:
+        value = row.get(alias)
+        if value not in (None, ""):
+            return value.strip()
+    return ""
+
+
+def parse_row(row):
+    """CSVの1行を (name, year, month, day) にする"""
+    name = _column(row, "name")
+    if not name:
+        raise RowError("お名前がありません")
+    birth_date = _column(row, "birth_date")
+    try:
+        if birth_date:
+            year, month, day = (int(part) for part in re.split(r"[-/.]", birth_date))
+        else:
+            year, month, day = int(_column(row, "year")), int(_column(row, "month")), int(_column(row, "day"))
+        date(year, month, day)
+    except ValueError:
+        raise RowError("生年月日が正しくありません") from None
+    return name, year, month, day
+
+
+def output_filename(row_no, name, output_format):
+    return f"{row_no:06d}_{_UNSAFE_FILENAME_CHARS.sub('_', name)[:40]}.{output_format}"
+
+
+# ==========================================
+# ワーカープロセス
+# ==========================================
+_worker = {}
+
+
+def _init_worker(config_file, output_dir, output_format, today):
+    _worker.update(loaded=get_config(config_file), output_dir=output_dir,
+                   output_format=output_format, today=today)
+    if output_format == "pdf":
+        from uranai.fonts import register_font
+        if register_font() is None:
+            # 英語フォントで書き出すと日本語がすべて消えるため、発行しない
+            raise RuntimeError("日本語フォントを登録できませんでした")
+
+
+def _process_chunk(rows):
+    """(行番号, name, year, month, day) のリストを鑑定して書き出し、件数とバイト数を返す"""
+    from uranai.reading import compute_reading, reading_pdf
+
+    loaded = _worker["loaded"]
+    output_format = _worker["output_format"]
+    written = 0
+    for row_no, name, year, month, day in rows:
+        reading = compute_reading(loaded, name, year, month, day, today=_worker["today"])
+        if output_format == "pdf":
+            data = reading_pdf(loaded, reading)
+        else:
+            # アプリのテキスト保存と同じくBOM付きUTF-8
+            data = reading.text.encode("utf-8-sig")
+        with open(os.path.join(_worker["output_dir"], output_filename(row_no, name, output_format)), "wb") as f:
+            f.write(data)
+        written += len(data)
+    return len(rows), written
+
+
+# ==========================================
+# 親プロセス
+# ==========================================
+def iter_chunks(reader, chunk_size, on_error):
+    """CSVを読みながら chunk_size 件ずつに分ける（読めない行は on_error に渡す）"""
+    chunk = []
+    for row_no, row in enumerate(reader, start=1):
+        try:
+            chunk.append((row_no, *parse_row(row)))
+        except RowError as e:
+            on_error(row_no, _column(row, "name"), str(e))
+            continue
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(input_file, output_dir, config_file=DEFAULT_CONFIG_FILE, output_format="txt",
+              jobs=None, chunk_size=64, today=None, progress=sys.stderr):
+    """CSVを一括処理して (処理件数, エラー件数, 経過秒) を返す"""
+    jobs = jobs or os.cpu_count() or 1
+    today = today or datetime.now()
+    get_config(config_file)  # 設定の不備はワーカー起動前に検出する
+    if output_format == "pdf":
+        from uranai.fonts import get_font_path
+        if not get_font_path():
+            raise SystemExit("日本語フォントがないためPDFを発行できません（python -m uranai.fonts build で用意してください）")
+    os.makedirs(output_dir, exist_ok=True)
+
+    done = written = 0
+    failed = [0]
+    start = time.perf_counter()
+    # 同時に投入するチャンク数を制限して、入力を先読みしすぎないようにする
+    max_in_flight = jobs * 2
+    with open(input_file, newline="", encoding="utf-8-sig") as f, \
+            open(os.path.join(output_dir, "errors.csv"), "w", newline="", encoding="utf-8-sig") as error_file, \
+            ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                initargs=(config_file, output_dir, output_format, today)) as pool:
+        errors = csv.writer(error_file)
+        errors.writerow(["row", "name", "error"])
+
+        def on_error(row_no, name, message):
+            errors.writerow([row_no, name, message])
+            failed[0] += 1
+
+        pending = set()
+        for chunk in iter_chunks(csv.DictReader(f), chunk_size, on_error):
+            if len(pending) >= max_in_flight:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    count, size = future.result()
+                    done += count
+                    written += size
+                if progress:
+                    elapsed = time.perf_counter() - start
+                    print(f"\r{done}件  {done / elapsed:.1f}件/秒", end="", file=progress, flush=True)
+            pending.add(pool.submit(_process_chunk, chunk))
+        for future in pending:
+            count, size = future.result()
+            done += count
+            written += size
+
+    elapsed = time.perf_counter() - start
+    if progress:
+        print(f"\r{done}件（エラー {failed[0]}件）  {elapsed:.2f}秒  {done / elapsed if elapsed else 0:.1f}件/秒"
+              f"  出力 {written / 1024 / 1024:.1f} MB", file=progress)
+    return done, failed[0], elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m uranai.batch", description="CSVから鑑定書を一括発行する")
+    parser.add_argument("input", help="お名前・生年月日のCSVファイル")
+    parser.add_argument("-o", "--output", required=True, help="出力先ディレクトリ")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_FILE, help="設定ファイル（config.json / config_love.json）")
+    parser.add_argument("--format", choices=FORMATS, default="txt")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="ワーカープロセス数（既定：CPUコア数）")
+    parser.add_argument("--chunk-size", type=int, default=64, help="1回にワーカーへ渡す行数")
+    parser.add_argument("--date", help="鑑定日（YYYY-MM-DD、恋愛モードのシードにも使う。既定：今日）")
+    args = parser.parse_args(argv)
+
+    today = datetime.strptime(args.date, "%Y-%m-%d") if args.date else None
+    done, failed, _ = run_batch(args.input, args.output, args.config, args.format,
+                                args.jobs, args.chunk_size, today)
+    return 1 if failed and not done else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""日付が変わると失効する鑑定結果のキャッシュ
+
+鑑定結果（全文）は、同じ設定・お名前・生年月日・日付なら必ず同じになる。
+購入後の画面の再実行のたびに作り直さないよう、件数上限付きのLRUで保持する。
+恋愛診断のシードは日付で変わるため、キーには日付（YYYY-MM-DD）を含め、
+ローカル時刻の0時を過ぎたら前日以前の結果を破棄する。
+
+恋愛診断の結果（番号）の選択はMD5を1回計算するだけで、キャッシュから返すのと
+時間が変わらないためキャッシュしない。
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+
+def _next_midnight():
+    """次のローカル時刻0時のUNIX時刻"""
+    return datetime.combine(date.today() + timedelta(days=1), datetime.min.time()).timestamp()
+
+
+class DailyCache:
+    """日付ごとの結果を保持するLRUキャッシュ（スレッドセーフ）"""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._expires_at = _next_midnight()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, key, day, compute):
+        """(day, key) の結果を返す。なければ compute() の結果を保存して返す
+
+        day は結果のシードに使う日付文字列（YYYY-MM-DD）。
+        """
+        full_key = (day, key)
+        with self._lock:
+            if time.time() >= self._expires_at:
+                self._expire()
+            try:
+                value = self._entries[full_key]
+            except KeyError:
+                self.counters["misses"] += 1
+            else:
+                self._entries.move_to_end(full_key)
+                self.counters["hits"] += 1
+                return value
+
+        # 結果は入力だけで決まるため、同じキーを別スレッドが同時に計算しても問題ない
+        value = compute()
+        with self._lock:
+            self._entries[full_key] = value
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+        return value
+
+    def _expire(self):
+        """今日より前の日付の結果を捨てる（ロックを取得して呼ぶ）"""
+        today = date.today().isoformat()
+        for full_key in [k for k in self._entries if k[0] < today]:
+            del self._entries[full_key]
+            self.counters["expired"] += 1
+        self._expires_at = _next_midnight()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["size"] = len(self._entries)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# 鑑定結果（全文）。1件が Reading＋Document で10〜25KBほどあるため、既定の512件で
+# 1プロセスあたり十数MBまで（環境変数 URANAI_READING_CACHE_SIZE で変更可）
+READING_CACHE_SIZE = 512
+readings = DailyCache(int(os.environ.get("URANAI_READING_CACHE_SIZE") or READING_CACHE_SIZE))
+
+
+def cache_stats():
+    """キャッシュごとの統計（hits / misses / evictions / expired / size）"""
+    return {"readings": readings.stats()}
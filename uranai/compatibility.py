@@ -0,0 +1,206 @@
+"""グループの相性（全員の総当たり）
+
+使い方:
+    python -m uranai.compatibility members.csv [--config config.json] [--top 20]
+                                   [--ranking ranking.csv] [--matrix matrix.csv]
+
+店舗・オンラインのイベントや法人イベントで、参加者全員の組み合わせの相性を出す。
+全員のライフパスナンバーを NumPy でまとめて求め、設定の相性表（12×12）を
+配列のインデックス参照で引いて N×N の相性スコアの行列を作る。
+数千人（数百万組）でも1秒かからない。
+
+相性表は設定ファイルの "compatibility" に書く（全ナンバーの組が必要）：
+    "compatibility": {
+        "scores": {"1": {"1": 80, "2": 60, ...}, ...},   ← 0〜100。片方向だけ書けばよい
+        "labels": [[90, "運命的な相性"], [80, "とても良い相性"], [0, "刺激し合える相性"]]
+    }
+入力のCSVは uranai.batch と同じ形式（name,year,month,day または name,birth_date）。
+"""
+import argparse
+import csv
+import functools
+import sys
+import time
+from typing import NamedTuple
+
+from uranai.config import DEFAULT_CONFIG_FILE, ConfigError, get_config
+from uranai.fortune import LIFE_PATH_NUMBERS
+from uranai.numerology import life_path_numbers
+
+DEFAULT_RANKING_LIMIT = 100
+# ランキングを作るときに一度に調べる行数（大きなグループでも一時配列を小さく保つ）
+RANKING_ROW_BLOCK = 512
+
+
+# ==========================================
+# 相性表
+# ==========================================
+@functools.lru_cache(maxsize=16)
+def score_table(loaded_config):
+    """設定1版分の相性表（table[ナンバー, ナンバー] でスコア。形は (34, 34)、対称）"""
+    import numpy as np
+
+    if "compatibility" not in loaded_config.data:
+        raise ConfigError(loaded_config.path, "相性表（compatibility）が設定されていません")
+    size = max(LIFE_PATH_NUMBERS) + 1
+    table = np.zeros((size, size), dtype=np.uint8)
+    # 組がすべて揃っていることは設定の読み込み時に確認している
+    for a, row in loaded_config.data["compatibility"]["scores"].items():
+        for b, score in row.items():
+            table[int(a), int(b)] = table[int(b), int(a)] = score
+    table.flags.writeable = False
+    return table
+
+
+@functools.lru_cache(maxsize=16)
+def score_labels(loaded_config):
+    """(下限スコア, 表示名) の一覧（下限の高い順）"""
+    labels = loaded_config.data["compatibility"]["labels"]
+    return tuple(sorted(((int(minimum), label) for minimum, label in labels), reverse=True))
+
+
+def score_label(loaded_config, score):
+    for minimum, label in score_labels(loaded_config):
+        if score >= minimum:
+            return label
+    return ""
+
+
+# ==========================================
+# 総当たりの計算
+# ==========================================
+class PairScore(NamedTuple):
+    """2人の相性（first・second は members の番号、first < second）"""
+    score: int
+    label: str
+    first: int
+    second: int
+
+
+class GroupCompatibility(NamedTuple):
+    """グループ全員の相性"""
+    names: tuple
+    life_path_numbers: object  # NumPy配列 (N,)
+    matrix: object             # NumPy配列 (N, N)。matrix[i, j] が i と j の相性（対角は同じナンバーどうしの値）
+    ranking: tuple             # 相性の高い順の PairScore（同点は番号順。最大 limit 組）
+    pair_count: int            # 組み合わせの総数 N(N-1)/2
+
+
+def compatibility_matrix(loaded_config, lps):
+    """ライフパスナンバーの配列から N×N の相性行列を作る（相性表をまとめて引く）"""
+    table = score_table(loaded_config)
+    return table[lps[:, None], lps[None, :]]
+
+
+def ranked_pairs(loaded_config, lps, matrix, limit=DEFAULT_RANKING_LIMIT):
+    """相性の高い順に limit 組まで（同じ人どうしは含めない）
+
+    スコアは相性表の値しか取らないため、現れるスコアを高い順にたどり、
+    そのスコアの組を行列から数行ずつ取り出す（全組の並べ替えはしない）。
+    """
+    import numpy as np
+
+    present = np.unique(lps)
+    levels = np.unique(score_table(loaded_config)[np.ix_(present, present)])[::-1]
+    ranking = []
+    for score in levels.tolist():
+        label = score_label(loaded_config, score)
+        for start in range(0, len(lps), RANKING_ROW_BLOCK):
+            need = limit - len(ranking)
+            if need <= 0:
+                return tuple(ranking)
+            # 行優先の順に並ぶため、同点の組は番号順になる
+            firsts, seconds = np.nonzero(matrix[start:start + RANKING_ROW_BLOCK] == score)
+            firsts += start
+            upper = firsts < seconds
+            for first, second in zip(firsts[upper][:need].tolist(), seconds[upper][:need].tolist()):
+                ranking.append(PairScore(score, label, first, second))
+    return tuple(ranking)
+
+
+def group_compatibility(loaded_config, members, limit=DEFAULT_RANKING_LIMIT):
+    """members（(name, year, month, day) の並び）全員の相性の行列と上位の組"""
+    import numpy as np
+
+    members = list(members)
+    if members:
+        names, years, months, days = zip(*members)
+    else:
+        names, years, months, days = (), (), (), ()
+    lps = life_path_numbers(years, months, days).astype(np.intp)
+    matrix = compatibility_matrix(loaded_config, lps)
+    return GroupCompatibility(tuple(names), lps, matrix, ranked_pairs(loaded_config, lps, matrix, limit),
+                              len(members) * (len(members) - 1) // 2)
+
+
+# ==========================================
+# CLI
+# ==========================================
+def read_members(input_file, on_error=None):
+    """CSV（uranai.batch と同じ形式）から (name, year, month, day) の一覧を読む"""
+    from uranai.batch import RowError, _column, parse_row
+
+    members = []
+    with open(input_file, newline="", encoding="utf-8-sig") as f:
+        for row_no, row in enumerate(csv.DictReader(f), start=1):
+            try:
+                members.append(parse_row(row))
+            except RowError as e:
+                if on_error:
+                    on_error(row_no, _column(row, "name"), str(e))
+    return members
+
+
+def write_ranking(path, result):
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(["rank", "name1", "lp1", "name2", "lp2", "score", "label"])
+        for rank, pair in enumerate(result.ranking, start=1):
+            writer.writerow([rank, result.names[pair.first], int(result.life_path_numbers[pair.first]),
+                             result.names[pair.second], int(result.life_path_numbers[pair.second]),
+                             pair.score, pair.label])
+
+
+def write_matrix(path, result):
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow([""] + list(result.names))
+        for name, row in zip(result.names, result.matrix.tolist()):
+            writer.writerow([name] + row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m uranai.compatibility",
+                                     description="グループ全員の組み合わせの相性を出す")
+    parser.add_argument("input", help="お名前・生年月日のCSVファイル")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_FILE, help="設定ファイル（相性表）")
+    parser.add_argument("--top", type=int, default=20, help="表示する組数")
+    parser.add_argument("--limit", type=int, default=DEFAULT_RANKING_LIMIT, help="ランキングに含める組数")
+    parser.add_argument("--ranking", help="ランキングのCSVの出力先")
+    parser.add_argument("--matrix", help="相性行列のCSVの出力先（N×N）")
+    args = parser.parse_args(argv)
+
+    def on_error(row_no, name, message):
+        print(f"{row_no}行目（{name}）: {message}", file=sys.stderr)
+
+    loaded = get_config(args.config)
+    if "compatibility" not in loaded.data:
+        raise SystemExit(f"{args.config} に相性表（compatibility）がありません")
+    members = read_members(args.input, on_error)
+    start = time.perf_counter()
+    result = group_compatibility(loaded, members, max(args.limit, args.top))
+    elapsed = time.perf_counter() - start
+    print(f"{len(members)}人・{result.pair_count}組  {elapsed * 1000:.1f}ms")
+    for rank, pair in enumerate(result.ranking[:args.top], start=1):
+        print(f"{rank:4d}. {result.names[pair.first]}（{result.life_path_numbers[pair.first]}）× "
+              f"{result.names[pair.second]}（{result.life_path_numbers[pair.second]}）  {pair.score}点 {pair.label}")
+
+    if args.ranking:
+        write_ranking(args.ranking, result)
+    if args.matrix:
+        write_matrix(args.matrix, result)
+    return 0 if members else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
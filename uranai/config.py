@@ -0,0 +1,254 @@
+"""設定ファイル（config*.json）のプロセス共通レジストリ
+
+Streamlitは操作のたびにapp.pyを先頭から再実行するため、毎回JSONを
+読み直すと無駄が大きい。ここでは設定ファイルごとに一度だけパースし、
+ファイルの更新時刻（mtime）が変わったときだけ読み直す。
+セッションには変更不可（イミュータブル）な検証済みオブジェクトを渡す。
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_FILE = "config.json"
+
+# 設定ファイル名のマッピング（URLの config パラメータで短縮名でも指定可能）
+CONFIG_MAP = {
+    "love": "config_love.json",
+    "february": "config_love_february.json",
+    "default": "config.json"
+}
+APP_MODES = ("normal", "love")
+# 恋愛モードの無料プレビューは results['basic'] の各結果をこの見出しを含むセクションまで表示する
+LOVE_PREVIEW_COURSE = "basic"
+LOVE_PREVIEW_MARKERS = ("【2月の戦略アドバイス】", "【注意点】")
+# 相性表（compatibility.scores）のキーに使えるライフパスナンバー
+LIFE_PATH_KEYS = ("1", "2", "3", "4", "5", "6", "7", "8", "9", "11", "22", "33")
+
+
+class ConfigError(Exception):
+    """設定ファイルの読み込み・検証エラー"""
+
+    def __init__(self, path, message):
+        super().__init__(f"{path}: {message}")
+        self.path = path
+        self.message = message
+
+
+class ConfigNotFoundError(ConfigError):
+    """設定ファイルが存在しない"""
+
+
+@dataclass(frozen=True, eq=False)
+class LoadedConfig:
+    """読み込み済みの設定（1ファイル・1バージョン分）
+
+    eq=False のため同一性でハッシュされ、設定から派生するデータ
+    （運勢テーブルなど）のキャッシュキーとしてそのまま使える。
+    """
+    path: str
+    mtime_ns: int
+    size: int
+    digest: str
+    data: MappingProxyType = field(repr=False)
+    warnings: tuple = ()  # 読み込みは続けられるが修正が必要な点
+    # 恋愛モードの無料プレビューの文（results[LOVE_PREVIEW_COURSE] と同じ並び。読み込み時に1回だけ作る）
+    love_previews: tuple = field(default=(), repr=False)
+
+    @property
+    def mode(self):
+        return self.data.get("mode", "normal")
+
+
+def freeze(value):
+    """dict/list を MappingProxyType/tuple に再帰的に変換する"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def _require_mapping(path, data, key):
+    value = data.get(key, {})
+    if not isinstance(value, dict):
+        raise ConfigError(path, f"'{key}' はオブジェクトである必要があります")
+    return value
+
+
+def split_love_preview(diagnosis_result):
+    """診断結果のうち無料プレビューに表示する部分と、区切りの見出しがあったかどうか
+
+    戦略アドバイス（または注意点）のセクションまでを表示する。区切りの見出しがない結果は、
+    全文を見せてしまわないよう最初のセクションだけにする。
+    """
+    sections = diagnosis_result.split("\n\n")
+    # 脈あり度、総合診断、相手の心理状態まで表示
+    cut = next((i + 1 for i, section in enumerate(sections)
+                if any(marker in section for marker in LOVE_PREVIEW_MARKERS)), None)
+    preview = "\n\n".join(sections[:cut or 1])
+    # 最後に「...」を追加して続きがあることを示す
+    if len(sections) > (cut or 1):
+        preview += "\n\n..."
+    return preview, cut is not None
+
+
+def validate_config(path, data):
+    """設定の構造を検証する（問題があれば ConfigError、軽微な問題は警告文のリストで返す）"""
+    if not isinstance(data, dict):
+        raise ConfigError(path, "トップレベルはオブジェクトである必要があります")
+
+    mode = data.get("mode", "normal")
+    if mode not in APP_MODES:
+        raise ConfigError(path, f"不明なmodeです: {mode!r}")
+
+    for key in ("ui", "pdf", "life_path_descriptions"):
+        _require_mapping(path, data, key)
+
+    for lp, lp_data in data.get("life_path_descriptions", {}).items():
+        if not isinstance(lp_data, dict):
+            raise ConfigError(path, f"life_path_descriptions['{lp}'] はオブジェクトである必要があります")
+        for category in ("love", "work", "money", "health"):
+            stars = lp_data.get(category, {}).get("stars", 3)
+            if not isinstance(stars, int) or not 0 <= stars <= 5:
+                raise ConfigError(path, f"life_path_descriptions['{lp}'].{category}.stars は0〜5の整数である必要があります")
+
+    monthly = data.get("monthly_fortunes", [])
+    if not isinstance(monthly, list) or not all(isinstance(m, str) for m in monthly):
+        raise ConfigError(path, "'monthly_fortunes' は文字列の配列である必要があります")
+
+    results = _require_mapping(path, data, "results")
+    for course, course_results in results.items():
+        if not isinstance(course_results, list) or not all(isinstance(r, str) for r in course_results):
+            raise ConfigError(path, f"results['{course}'] は文字列の配列である必要があります")
+    if mode == "love" and not results.get(LOVE_PREVIEW_COURSE):
+        raise ConfigError(path, f"love モードには results['{LOVE_PREVIEW_COURSE}'] が必要です")
+
+    if "compatibility" in data:
+        _validate_compatibility(path, _require_mapping(path, data, "compatibility"))
+
+    warnings = []
+    if mode == "love":
+        for i, result in enumerate(results[LOVE_PREVIEW_COURSE]):
+            if not split_love_preview(result)[1]:
+                warnings.append(f"results['{LOVE_PREVIEW_COURSE}'][{i}] にプレビューの区切り"
+                                f"（{' / '.join(LOVE_PREVIEW_MARKERS)}）がないため、プレビューは最初のセクションだけを表示します")
+    return warnings
+
+
+def _validate_compatibility(path, compatibility):
+    """相性表：全ナンバーの組のスコアがあり、(a, b) と (b, a) の両方を書いた組は同じスコアであること"""
+    scores = compatibility.get("scores", {})
+    if not isinstance(scores, dict) or not all(isinstance(row, dict) for row in scores.values()):
+        raise ConfigError(path, "compatibility.scores は {ナンバー: {ナンバー: スコア}} の形式である必要があります")
+    pairs = {}
+    for a, row in scores.items():
+        for b, score in row.items():
+            if a not in LIFE_PATH_KEYS or b not in LIFE_PATH_KEYS:
+                raise ConfigError(path, f"compatibility.scores['{a}']['{b}'] は存在しないライフパスナンバーです")
+            if not isinstance(score, int) or isinstance(score, bool) or not 0 <= score <= 100:
+                raise ConfigError(path, f"compatibility.scores['{a}']['{b}'] は0〜100の整数である必要があります")
+            pair = frozenset((a, b))
+            if pairs.setdefault(pair, score) != score:
+                raise ConfigError(path, f"compatibility.scores['{a}']['{b}'] と ['{b}']['{a}'] のスコアが異なります")
+    missing = [f"{a}-{b}" for i, a in enumerate(LIFE_PATH_KEYS) for b in LIFE_PATH_KEYS[i:]
+               if frozenset((a, b)) not in pairs]
+    if missing:
+        raise ConfigError(path, f"compatibility.scores に次の組のスコアがありません: {', '.join(missing)}")
+    labels = compatibility.get("labels", [])
+    if not labels or not isinstance(labels, list) or not all(
+            isinstance(item, list) and len(item) == 2 and isinstance(item[0], int) and isinstance(item[1], str)
+            for item in labels):
+        raise ConfigError(path, "compatibility.labels は [下限スコア, 表示名] の配列である必要があります")
+
+
+def parse_config(path, raw, mtime_ns):
+    """JSONバイト列をパース・検証して LoadedConfig を作る"""
+    try:
+        data = json.loads(raw.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ConfigError(path, f"JSON形式が正しくありません: {e}") from e
+    warnings = validate_config(path, data)
+    for warning in warnings:
+        logger.warning("%s: %s", path, warning)
+    love_previews = ()
+    if data.get("mode", "normal") == "love":
+        love_previews = tuple(split_love_preview(result)[0] for result in data["results"][LOVE_PREVIEW_COURSE])
+    return LoadedConfig(
+        path=path,
+        mtime_ns=mtime_ns,
+        size=len(raw),
+        digest=hashlib.sha1(raw).hexdigest(),
+        data=freeze(data),
+        warnings=tuple(warnings),
+        love_previews=love_previews,
+    )
+
+
+def resolve_config_file(config_param):
+    """config パラメータの値から設定ファイル名を決定する"""
+    if config_param in CONFIG_MAP:
+        # 短縮名が指定された場合
+        return CONFIG_MAP[config_param]
+    if config_param.endswith(".json"):
+        # 直接ファイル名が指定された場合
+        return config_param
+    # パラメータがない、または不明な値の場合
+    return DEFAULT_CONFIG_FILE
+
+
+class ConfigRegistry:
+    """設定ファイルをmtime監視付きでキャッシュするレジストリ（スレッドセーフ）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._configs = {}
+        self.loads = 0
+
+    def get(self, config_path=DEFAULT_CONFIG_FILE):
+        path = os.path.abspath(config_path)
+        try:
+            file_stat = os.stat(path)
+        except FileNotFoundError:
+            raise ConfigNotFoundError(config_path, "設定ファイルが見つかりません") from None
+
+        cached = self._configs.get(path)
+        if cached is not None and cached.mtime_ns == file_stat.st_mtime_ns and cached.size == file_stat.st_size:
+            return cached
+
+        with self._lock:
+            cached = self._configs.get(path)
+            if cached is not None and cached.mtime_ns == file_stat.st_mtime_ns and cached.size == file_stat.st_size:
+                return cached
+            try:
+                with open(path, "rb") as f:
+                    raw = f.read()
+                loaded = parse_config(config_path, raw, file_stat.st_mtime_ns)
+            except ConfigError as e:
+                if cached is None:
+                    raise
+                # 編集途中の壊れたファイルでサービスを止めないよう、直前の正常な版を使い続ける
+                # （同じ壊れた版を毎回読み直さないよう、mtimeだけ更新して保持する）
+                logger.warning("設定ファイルの再読み込みに失敗したため、前回の設定を使用します: %s", e)
+                loaded = replace(cached, mtime_ns=file_stat.st_mtime_ns, size=file_stat.st_size)
+            self._configs[path] = loaded
+            self.loads += 1
+            return loaded
+
+    def clear(self):
+        with self._lock:
+            self._configs.clear()
+
+
+# プロセス共通のレジストリ（Streamlitの再実行をまたいで保持される）
+registry = ConfigRegistry()
+
+
+def get_config(config_path=DEFAULT_CONFIG_FILE):
+    """プロセス共通レジストリから設定を取得する"""
+    return registry.get(config_path)
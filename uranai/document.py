@@ -0,0 +1,210 @@
+"""鑑定結果の文書モデルとテキスト・HTMLへの出力
+
+設定ファイルの見出し・ラベル・セクション順は設定ごとに一度だけ Template に
+まとめておき（compile_template）、1人分の鑑定結果はブロックの並び（Document）
+として組み立てる。テキスト保存用の全文・画面の鑑定結果カード・PDF鑑定書
+（uranai.pdf.render_pdf）は、すべて同じ Document から出力する。
+"""
+import html
+from datetime import datetime
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple
+
+from uranai.fortune import RATING_CATEGORIES, get_fortune_data, get_monthly_fortunes
+
+DEFAULT_SECTION_TITLES = {
+    "overall": "【総合運】",
+    "love": "【恋愛運】",
+    "work": "【仕事運】",
+    "money": "【金運】",
+    "health": "【健康運】",
+    "lucky": "【ラッキーカラー・アイテム】",
+}
+LOVE_BANNER_RULE = "━━━━━━━━━━━━━━━━━━━━━━"
+
+# ブロックの種類
+#   title       見出し行（テキスト・カードのみ。PDFはヘッダーに名前を表示する）
+#   banner      恋愛モードの飾り枠つき見出し（テキスト・カードのみ）
+#   birth_date  生年月日（テキスト・カードのみ。PDFはヘッダーに表示する）
+#   meta        鑑定対象期間・鑑定日などの補足
+#   gap         PDFでの余白
+#   lp          ライフパスナンバー
+#   heading     セクション見出し
+#   pdf_heading PDFだけに出すセクション見出し
+#   rating      ランク・★評価
+#   paragraph   本文
+#   small       月別運勢などの小さめの本文
+TEXT_ONLY_KINDS = frozenset({"title", "banner", "birth_date"})
+PDF_ONLY_KINDS = frozenset({"gap", "pdf_heading"})
+
+
+class Block(NamedTuple):
+    """文書の1ブロック"""
+    kind: str
+    text: str
+    sep: str = "\n"   # テキスト出力でこのブロックの後に続く区切り
+    icon: str = ""    # テキスト・カードだけで先頭に付ける絵文字
+
+
+class Document(NamedTuple):
+    """1人分の鑑定結果（出力形式に依存しない）"""
+    template: "Template"
+    name: str
+    year: int
+    month: int
+    day: int
+    today: datetime
+    blocks: tuple
+
+
+class Template(NamedTuple):
+    """設定1版分の見出し・ラベル（compile_template で作る）"""
+    mode: str
+    fortune_year: str
+    lp_label: str
+    section_titles: MappingProxyType        # "overall" などのキー → 【】付きの見出し
+    plain_section_titles: MappingProxyType  # 【】を外した見出し（無料プレビュー用）
+    monthly_title: str
+    # PDFのヘッダー・フッター
+    pdf_title: str
+    name_suffix: str
+    birth_date_label: str
+    footer_lines: tuple   # (テキスト, 文字サイズ, 行送り)
+    author: str
+
+
+@lru_cache(maxsize=16)
+def compile_template(loaded_config):
+    """設定から見出し・ラベルを取り出して Template にまとめる（設定ごとに1回）"""
+    config = loaded_config.data
+    pdf_config = config.get("pdf", {})
+    labels = pdf_config.get("labels", {})
+    sections = pdf_config.get("sections", {})
+
+    section_titles = {key: sections.get(key, title) for key, title in DEFAULT_SECTION_TITLES.items()}
+    footer_lines = []
+    teller = config.get("fortune_teller_name", "")
+    if teller:
+        footer_lines.append((f"{labels.get('fortune_teller_prefix', '鑑定した占い師')}: {teller}", 10, 16))
+    if labels.get("disclaimer"):
+        footer_lines.append((labels["disclaimer"], 9, 14))
+    site_name = config.get("fortune_site_name", "")
+    if site_name:
+        footer_lines.append(
+            (f"{labels.get('learn_more_prefix', '')} {site_name} {labels.get('learn_more_suffix', '')}".strip(), 9, 14))
+
+    return Template(
+        mode=loaded_config.mode,
+        fortune_year=config.get("fortune_year", "2月" if loaded_config.mode == "love" else ""),
+        lp_label=labels.get("life_path_number", "ライフパスナンバー:"),
+        section_titles=MappingProxyType(section_titles),
+        plain_section_titles=MappingProxyType(
+            {key: title.replace("【", "").replace("】", "") for key, title in section_titles.items()}),
+        monthly_title=config.get("pdf_monthly_title", "月別運勢カレンダー"),
+        pdf_title=config.get("pdf_title", "運勢鑑定書"),
+        name_suffix=pdf_config.get("name_suffix", "様"),
+        birth_date_label=labels.get("birth_date", "生年月日:"),
+        footer_lines=tuple(footer_lines),
+        author=site_name,
+    )
+
+
+# ==========================================
+# 文書の組み立て
+# ==========================================
+def _normal_blocks(template, loaded_config, name, lp):
+    data = get_fortune_data(loaded_config, lp)
+    titles = template.section_titles
+    blocks = [Block("title", f"{name} 様の{template.fortune_year}運勢", "\n\n")]
+
+    if data["lp_description"]:
+        blocks += [Block("lp", f"{template.lp_label} {lp}"), Block("paragraph", data["lp_description"], "\n\n")]
+    else:
+        blocks.append(Block("lp", f"{template.lp_label} {lp}", "\n\n\n"))
+
+    blocks += [
+        Block("heading", titles["overall"]),
+        Block("rating", data["overall"].rank),
+        Block("paragraph", data["overall"].description, "\n\n"),
+    ]
+    for category in RATING_CATEGORIES:
+        rating = data[category]
+        blocks += [
+            Block("heading", titles[category]),
+            Block("rating", rating.star_text),
+            Block("paragraph", rating.description, "\n\n"),
+        ]
+
+    if data["color"] or data["item"]:
+        blocks.append(Block("pdf_heading", titles["lucky"], ""))
+        if data["color"]:
+            blocks.append(Block("paragraph", f"ラッキーカラー: {data['color']}"))
+        if data["item"]:
+            blocks.append(Block("paragraph", f"ラッキーアイテム: {data['item']}", "\n\n"))
+
+    monthly = get_monthly_fortunes(loaded_config, lp)
+    if monthly:
+        blocks.append(Block("heading", template.monthly_title))
+        blocks += [Block("small", txt) for txt in monthly if txt and txt.strip()]
+    return blocks
+
+
+def _love_blocks(template, name, year, month, day, diagnosis_text, today):
+    blocks = [
+        Block("banner", f"{LOVE_BANNER_RULE}\n💘 {name} 様 専用鑑定書 💘\n{LOVE_BANNER_RULE}", "\n\n"),
+        Block("birth_date", f"生年月日: {year}年{month}月{day}日", icon="📅"),
+        Block("meta", f"鑑定対象期間: {template.fortune_year}", icon="📆"),
+        Block("meta", f"鑑定日: {today.strftime('%Y年%m月%d日')}", "\n\n", icon="🔮"),
+        Block("gap", "", ""),
+    ]
+    lines = diagnosis_text.split("\n")
+    for i, line in enumerate(lines):
+        kind = "heading" if line.startswith("【") and line.endswith("】") else "paragraph"
+        blocks.append(Block(kind, line, "\n" if i < len(lines) - 1 else ""))
+    return blocks
+
+
+def build_document(loaded_config, name, year, month, day, today, lp=None, diagnosis_text=None):
+    """鑑定結果の文書を組み立てる（恋愛モードは diagnosis_text、通常モードは lp から）"""
+    template = compile_template(loaded_config)
+    if diagnosis_text is not None:
+        blocks = _love_blocks(template, name, year, month, day, diagnosis_text, today)
+    else:
+        blocks = _normal_blocks(template, loaded_config, name, lp)
+    return Document(template, name, year, month, day, today, tuple(blocks))
+
+
+# ==========================================
+# 出力：テキスト・HTML
+# ==========================================
+def render_text(document):
+    """テキスト保存・画面表示用の全文"""
+    parts = []
+    for block in document.blocks:
+        if block.kind in PDF_ONLY_KINDS:
+            continue
+        parts.append(f"{block.icon} {block.text}" if block.icon else block.text)
+        parts.append(block.sep)
+    return "".join(parts)
+
+
+_HTML_CLASSES = {"title": "fc-title", "banner": "fc-title", "heading": "fc-heading",
+                 "lp": "fc-rating", "rating": "fc-rating"}
+
+
+def render_html(document):
+    """鑑定結果カードの本文HTML（pre-wrap で表示する）
+
+    改行は文字参照（&#10;）にして1行にまとめる。Markdown の空行で
+    HTMLブロックが途切れないようにするため。
+    """
+    parts = []
+    for block in document.blocks:
+        if block.kind in PDF_ONLY_KINDS:
+            continue
+        text = html.escape(f"{block.icon} {block.text}" if block.icon else block.text)
+        css_class = _HTML_CLASSES.get(block.kind)
+        parts.append(f'<span class="{css_class}">{text}</span>' if css_class else text)
+        parts.append(block.sep)
+    return "".join(parts).replace("\n", "&#10;")
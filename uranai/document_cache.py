@@ -0,0 +1,225 @@
+"""ダウンロード用の鑑定書（PDF・テキスト）のディスクキャッシュ
+
+同じ人が同じ日にもう一度ダウンロードすると、PDFを毎回作り直していた。
+出力は設定・お名前・生年月日・日付（シード）・形式とコードだけで決まるため、
+それらのハッシュをファイル名にしてバイト列をディスクに保存し、次からは
+ファイルをそのまま st.download_button に渡す（内容アドレス方式）。
+
+- 保存先は環境変数 URANAI_DOCUMENT_CACHE_DIR（既定は data/documents）。
+  ディスクに残るため、プロセスを再起動しても使える
+- 合計サイズの上限は URANAI_DOCUMENT_CACHE_MAX_MB（既定 256MB）。超えたら
+  最後に使われた時刻（mtime。読み出すたびに更新する）の古い順に消す
+- 書き込みは一時ファイル＋os.replace で行うため、読み込み中のプロセスが
+  書きかけのファイルを見ることはない。同じ内容を複数のプロセスが同時に
+  書いても、どちらが残っても同じ内容になる
+- 削除（追い出し）はロックファイルで同じホストの1プロセスずつ行う
+
+キャッシュの読み書きに失敗しても、その場で作った内容を返す（ダウンロードは止めない）。
+"""
+import errno
+import fcntl
+import functools
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from uranai.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join("data", "documents")
+DEFAULT_MAX_MB = 256
+# 上限を超えたら、この割合まで減らす（追い出しのたびに全件を調べないよう余裕を持たせる）
+LOW_WATER_RATIO = 0.9
+# 他のプロセスの書き込みを反映するため、合計サイズを数え直す間隔（秒）
+RESCAN_INTERVAL = 60
+
+_TMP_PREFIX = ".tmp-"
+_LOCK_NAME = ".evict.lock"
+
+# 鑑定書の内容を決めるモジュール（ソースが変われば別のキーになる）
+RENDER_MODULES = ("numerology.py", "fortune.py", "love.py", "reading.py", "document.py", "pdf.py", "wrap.py",
+                  "fonts.py")
+
+
+@functools.lru_cache(maxsize=1)
+def render_fingerprint():
+    """鑑定・描画コードのハッシュ（デプロイで出力が変わったら古いキャッシュを使わない）"""
+    digest = hashlib.sha256()
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for module in RENDER_MODULES:
+        with open(os.path.join(package_dir, module), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def document_key(*parts):
+    """キーの要素（設定のダイジェスト・入力・日付・形式など）から内容アドレスを作る"""
+    source = "\n".join(str(part) for part in (render_fingerprint(),) + parts)
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+class DocumentCache:
+    """キー（ハッシュ）→ バイト列のディスクキャッシュ（サイズ上限付きLRU・複数プロセス可）"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None          # 合計サイズの見積もり（最後に数えた値＋このプロセスの書き込み）
+        self._scanned_at = 0.0
+        self.counters = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+    def _path(self, key):
+        # 1つのディレクトリにファイルが増えすぎないよう、先頭2文字で分ける
+        return os.path.join(self.directory, key[:2], key)
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def get(self, key):
+        """保存済みのバイト列（なければ None）。読み出したファイルは最近使ったものとして扱う"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        except OSError as e:
+            logger.warning("鑑定書キャッシュの読み込みに失敗しました: %s", e)
+            self._count("errors")
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            # 読み出した直後に別のプロセスが追い出した場合など（内容は読めている）
+            pass
+        self._count("hits")
+        return data
+
+    def put(self, key, data):
+        """data を保存する（一時ファイルに書いてから置き換える）"""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=_TMP_PREFIX, dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning("鑑定書キャッシュの保存に失敗しました: %s", e)
+            self._count("errors")
+            return
+        with self._lock:
+            self.counters["writes"] += 1
+            if self._size is not None:
+                self._size += len(data)
+            needs_check = (self._size is None or self._size > self.max_bytes
+                           or time.time() - self._scanned_at >= RESCAN_INTERVAL)
+        if needs_check:
+            try:
+                self.evict()
+            except OSError as e:
+                logger.warning("鑑定書キャッシュの整理に失敗しました: %s", e)
+                self._count("errors")
+
+    def get_or_render(self, key, render):
+        """保存済みならそのバイト列、なければ render() の結果を保存して返す"""
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.put(key, data)
+        return data
+
+    def _scan(self):
+        """(mtime, サイズ, パス) の一覧（書きかけの一時ファイルは含めない）"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.startswith(".") or name.startswith(_TMP_PREFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """合計サイズを数え直し、上限を超えていれば古い順に消す（消した件数を返す）
+
+        同じホストの別のプロセスが追い出し中なら何もしない。
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, _LOCK_NAME), "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError as e:
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+                return 0
+            try:
+                entries = self._scan()
+                total = sum(size for _, size, _ in entries)
+                removed = 0
+                if total > self.max_bytes:
+                    target = self.max_bytes * LOW_WATER_RATIO
+                    for _, size, path in sorted(entries):
+                        if total <= target:
+                            break
+                        try:
+                            os.unlink(path)
+                        except FileNotFoundError:
+                            pass
+                        total -= size
+                        removed += 1
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        with self._lock:
+            self._size = total
+            self._scanned_at = time.time()
+            self.counters["evictions"] += removed
+        return removed
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["bytes"] = self._size or 0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_document_cache():
+    """プロセス共通の DocumentCache を返す"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            max_mb = float(os.environ.get("URANAI_DOCUMENT_CACHE_MAX_MB", DEFAULT_MAX_MB))
+            _cache = DocumentCache(os.environ.get("URANAI_DOCUMENT_CACHE_DIR", DEFAULT_CACHE_DIR),
+                                   int(max_mb * 1024 * 1024))
+        return _cache
+
+
+def _document_cache_samples():
+    if _cache is None:
+        return
+    stats = _cache.stats()
+    for key in ("hits", "misses", "writes", "evictions", "errors"):
+        yield "uranai_document_cache_total", "counter", {"result": key}, stats[key]
+    yield "uranai_document_cache_bytes", "gauge", {}, stats["bytes"]
+
+
+metrics.add_collector(_document_cache_samples)
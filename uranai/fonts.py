@@ -0,0 +1,239 @@
+"""PDF用日本語フォントの準備・登録
+
+実行時にはフォントをダウンロードしない。次のコマンドでフォントを
+取得・サブセット化した `fonts/uranai_jp.ttf` をリポジトリに同梱している
+（設定ファイルの文言を変えたら作り直してコミットする）：
+
+    python -m uranai.fonts build [--source ipaexg.ttf]
+
+サブセットには設定ファイル・ソースコード中の文字と、お名前の入力に
+使われうる文字（英数字・かな・JIS第1/第2水準漢字など）だけを残す。
+実行時はフォントファイルをメモリマップして登録するため、ファイル内容は
+Pythonのヒープにコピーされず、複数のワーカープロセスでOSのページ
+キャッシュを共有できる。登録はプロセスごとに1回だけ行う。
+"""
+import glob
+import hashlib
+import logging
+import mmap
+import os
+import sys
+import threading
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+FONT_DIR = "fonts"
+# build コマンドで作るサブセットフォント（同梱用）
+FONT_PATH_SUBSET = os.path.join(FONT_DIR, "uranai_jp.ttf")
+FONT_NAME_SUBSET = "UranaiJP"
+# 手動で配置されたフォント（サブセットがない場合に使う）
+FONT_PATH_ROOT = "ipaexg.ttf"
+FONT_PATH_FALLBACK = os.path.join(FONT_DIR, "ipaexm.ttf")
+FONT_URL = "https://raw.githubusercontent.com/making/demo-jasper-report-ja/master/src/main/resources/fonts/ipaexm/ipaexm.ttf"
+
+# 日本語フォントが使えない場合の英語フォント（reportlab標準フォント）
+FALLBACK_FONT_NAME = "Helvetica"
+
+_UNSET = object()
+_registered_font = _UNSET
+_registered_file = None  # 登録したフォントの MappedFontFile
+_font_digest = None
+_register_lock = threading.Lock()
+
+
+# ==========================================
+# 実行時：フォントの検索・登録
+# ==========================================
+def get_font_path():
+    for path in (FONT_PATH_SUBSET, FONT_PATH_ROOT, FONT_PATH_FALLBACK):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def font_name_for(font_path):
+    if font_path == FONT_PATH_SUBSET:
+        return FONT_NAME_SUBSET
+    return 'IPAexGothic' if "ipaexg" in font_path.lower() else 'IPAexMincho'
+
+
+class MappedFontFile:
+    """reportlab の TTFont に渡すためのメモリマップ済みフォントファイル
+
+    TTFont は渡されたオブジェクトの read() の戻り値をそのままフォント
+    データとして保持するため、mmap をそのまま返してコピーを避ける。
+    """
+
+    def __init__(self, path):
+        self.name = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read(self):
+        return self._map
+
+
+def register_font():
+    """日本語フォントを登録してフォント名を返す（失敗時は None）
+
+    TTFのパースは重いため、結果（失敗も含む）をプロセス内で保持し、
+    2回目以降は何もしない。
+    """
+    global _registered_font
+    if _registered_font is not _UNSET:
+        return _registered_font
+    with _register_lock:
+        if _registered_font is _UNSET:
+            _registered_font = _register_font()
+        return _registered_font
+
+
+def _register_font():
+    font_path = get_font_path()
+    if not font_path:
+        logger.warning("日本語フォントが見つかりません（python -m uranai.fonts build で用意してください）")
+        return None
+    # reportlab の読み込みは重いため、フォントを登録するとき（PDFを作るとき）だけ読み込む
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    global _registered_file
+    try:
+        font_name = font_name_for(font_path)
+        font_file = MappedFontFile(font_path)
+        pdfmetrics.registerFont(TTFont(font_name, font_file))
+        _registered_file = font_file
+        return font_name
+    except Exception as e:
+        logger.warning("フォントの登録に失敗しました: %s: %s", font_path, e)
+    return None
+
+
+def registered_font_digest():
+    """登録したフォントの内容の SHA-256（日本語フォントがなければ空文字列）
+
+    PDFのキャッシュキーに使う。同じパスのフォントを作り直した場合も別のキーになる。
+    """
+    global _font_digest
+    if _font_digest is None:
+        register_font()
+        _font_digest = hashlib.sha256(_registered_file.read()).hexdigest() if _registered_file else ""
+    return _font_digest
+
+
+def pdf_font_name():
+    """PDF本文に使うフォント名（日本語フォントがなければ英語フォント）"""
+    return register_font() or FALLBACK_FONT_NAME
+
+
+# ==========================================
+# ビルド時：フォントの取得・サブセット化
+# ==========================================
+# お名前として入力されうる文字の範囲
+NAME_CHAR_RANGES = (
+    (0x0020, 0x007E),  # ASCII
+    (0x00A0, 0x00FF),  # ラテン1補助（アクセント付き文字）
+    (0x3000, 0x303F),  # CJKの記号・句読点
+    (0x3041, 0x309F),  # ひらがな
+    (0x30A0, 0x30FF),  # カタカナ
+    (0xFF01, 0xFF9F),  # 全角英数・半角カナ
+)
+CJK_RANGE = (0x4E00, 0x9FFF)
+
+
+def name_chars():
+    """お名前に使われうる文字（上記の範囲＋JIS第1/第2水準漢字・機種依存の人名漢字）"""
+    chars = set()
+    for first, last in NAME_CHAR_RANGES:
+        chars.update(chr(cp) for cp in range(first, last + 1))
+    for cp in range(CJK_RANGE[0], CJK_RANGE[1] + 1):
+        char = chr(cp)
+        try:
+            # CP932 で表せる漢字＝JIS X 0208（第1・第2水準）＋NEC/IBM拡張（髙・﨑など）
+            char.encode("cp932")
+        except UnicodeEncodeError:
+            continue
+        chars.add(char)
+    return chars
+
+
+def text_chars(patterns=("config*.json", "app.py", os.path.join("uranai", "*.py"))):
+    """設定ファイル・ソースコードに現れるすべての文字"""
+    chars = set()
+    for pattern in patterns:
+        for path in glob.glob(pattern):
+            with open(path, encoding="utf-8") as f:
+                chars.update(f.read())
+    return chars
+
+
+def fetch_font(url, path):
+    """フォントをダウンロードする（失敗時は例外をそのまま送出する）"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".part"
+    with urllib.request.urlopen(url, timeout=60) as res, open(tmp_path, "wb") as f:
+        f.write(res.read())
+    os.replace(tmp_path, path)
+    return path
+
+
+def subset_font(source, output, chars):
+    """fontTools でフォントを chars だけを含むサブセットにして保存する"""
+    try:
+        from fontTools import subset
+    except ImportError:
+        raise SystemExit("フォントのサブセット化には fonttools が必要です: pip install fonttools")
+
+    options = subset.Options()
+    options.hinting = False
+    options.name_IDs = ["*"]
+    options.name_languages = ["*"]
+    options.notdef_outline = True
+    font = subset.load_font(source, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=sorted(ord(ch) for ch in chars if not ch.isspace() or ch == " "))
+    subsetter.subset(font)
+    # IPAフォントライセンスに従い、派生フォントには別の名前を付ける
+    name_table = font["name"]
+    for name_id, value in ((1, "Uranai JP"), (3, "Uranai JP Subset"), (4, "Uranai JP"), (6, "UranaiJP")):
+        name_table.setName(value, name_id, 3, 1, 0x409)
+        name_table.setName(value, name_id, 1, 0, 0)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    subset.save_font(font, output, options)
+
+
+def build(argv=None):
+    # ビルド用のコマンドなので、実行時（アプリの起動時）には読み込まない
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m uranai.fonts build",
+                                     description="PDF用フォントを取得・サブセット化して fonts/ に同梱する")
+    parser.add_argument("--source", help="元のTTFファイル（省略時は --url からダウンロード）")
+    parser.add_argument("--url", default=FONT_URL)
+    parser.add_argument("--output", default=FONT_PATH_SUBSET)
+    parser.add_argument("--extra-chars", default="", help="追加で含める文字")
+    args = parser.parse_args(argv)
+
+    source = args.source
+    if not source:
+        source = os.path.join(FONT_DIR, "source.ttf")
+        print(f"ダウンロード中: {args.url}")
+        fetch_font(args.url, source)
+
+    chars = name_chars() | text_chars() | set(args.extra_chars)
+    subset_font(source, args.output, chars)
+    before, after = os.path.getsize(source), os.path.getsize(args.output)
+    print(f"{args.output}: {len(chars)}文字  {before / 1024:.0f} KB -> {after / 1024:.0f} KB")
+    if not args.source:
+        os.remove(source)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] != ["build"]:
+        raise SystemExit("使い方: python -m uranai.fonts build [--source FILE] [--output FILE]")
+    build(argv[1:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""数秘術モードの運勢データ（設定ごとに事前構築するルックアップテーブル）
+
+ライフパスナンバーは 1〜9, 11, 22, 33 の12種類しかないため、設定の読み込み
+ごとに一度だけ全ナンバー分のレコードを組み立てておき、リクエスト時は
+インデックス参照1回で済ませる。
+"""
+import functools
+from types import MappingProxyType
+from typing import NamedTuple
+
+LIFE_PATH_NUMBERS = (1, 2, 3, 4, 5, 6, 7, 8, 9, 11, 22, 33)
+RATING_CATEGORIES = ("love", "work", "money", "health")
+MAX_STARS = 5
+
+
+class Overall(NamedTuple):
+    """総合運（ランクと説明）"""
+    rank: str
+    description: str
+
+
+class Rating(NamedTuple):
+    """星評価つきの運勢（★の数・説明・表示用の★☆文字列）"""
+    stars: int
+    description: str
+    star_text: str
+
+
+def star_text(stars):
+    """星の数を「★★★☆☆」形式の文字列にする"""
+    return "★" * stars + "☆" * (MAX_STARS - stars)
+
+
+def build_fortune_record(lp_data):
+    """設定の1ナンバー分から表示用の変更不可レコードを作る"""
+    overall = lp_data.get("overall", {})
+    record = {
+        "personality": lp_data.get("personality", ""),
+        "lp_description": lp_data.get("lp_description", ""),
+        "overall": Overall(overall.get("rank", "中吉"), overall.get("description", "")),
+        "color": lp_data.get("color", ""),
+        "item": lp_data.get("item", ""),
+    }
+    for category in RATING_CATEGORIES:
+        category_data = lp_data.get(category, {})
+        stars = category_data.get("stars", 3)
+        record[category] = Rating(stars, category_data.get("description", ""), star_text(stars))
+    return MappingProxyType(record)
+
+
+@functools.lru_cache(maxsize=16)
+def fortune_table(loaded_config):
+    """設定1版分の運勢テーブル（インデックス＝ライフパスナンバー）を構築する
+
+    LoadedConfig は同一性でハッシュされるため、設定が再読み込みされると
+    新しいテーブルが作られる。
+    """
+    descriptions = loaded_config.data.get("life_path_descriptions", {})
+    default_record = build_fortune_record(descriptions.get("default", {}))
+    table = [default_record] * (max(LIFE_PATH_NUMBERS) + 1)
+    for lp in LIFE_PATH_NUMBERS:
+        if str(lp) in descriptions:
+            table[lp] = build_fortune_record(descriptions[str(lp)])
+    return tuple(table)
+
+
+def get_fortune_data(loaded_config, lp):
+    """ライフパスナンバーに対応する運勢レコードを返す（範囲外はdefault）"""
+    table = fortune_table(loaded_config)
+    if 0 <= lp < len(table):
+        return table[lp]
+    return table[0]
+
+
+def get_monthly_fortunes(loaded_config, lp):
+    """月別運勢（現在の設定ではライフパスナンバーによらず共通）"""
+    return loaded_config.data.get("monthly_fortunes", ())
@@ -0,0 +1,405 @@
+"""画面に埋め込むCSS・HTML断片
+
+Streamlitは再実行のたびに st.markdown の内容をそのままブラウザへ送り直す。
+大きなスタイル定義やフッターを毎回 f-string で組み立てて送らないよう、
+ここで設定ごとに一度だけ組み立て、空白やコメントを詰めた文字列を保持する。
+ベンチマーク: python -m benchmarks.bench_payload
+"""
+import re
+from functools import lru_cache
+
+# ==========================================
+# 縮小（minify）
+# ==========================================
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_PUNCTUATION_SPACE = re.compile(r"\s*([{};:,>])\s*")
+_WHITESPACE = re.compile(r"\s+")
+# ブロック要素（div・style）の前後の空白は表示に影響しないので取り除く
+_SPACE_AFTER_BLOCK_TAG = re.compile(r"(</?(?:div|style)\b[^>]*>)\s+")
+_SPACE_BEFORE_BLOCK_TAG = re.compile(r"\s+(</?(?:div|style)\b)")
+
+
+def minify_css(css):
+    """コメントと不要な空白を取り除く"""
+    css = _CSS_COMMENT.sub("", css)
+    css = _WHITESPACE.sub(" ", css)
+    css = _CSS_PUNCTUATION_SPACE.sub(r"\1", css)
+    return css.replace(";}", "}").replace(" !important", "!important").strip()
+
+
+def minify_html(html):
+    """ブロック要素まわりの空白を取り除き、連続する空白を1つにする（pre 系の要素には使わない）"""
+    html = _SPACE_AFTER_BLOCK_TAG.sub(r"\1", html)
+    html = _SPACE_BEFORE_BLOCK_TAG.sub(r"\1", html)
+    return _WHITESPACE.sub(" ", html).strip()
+
+
+def style_tag(css):
+    return f"<style>{minify_css(css)}</style>"
+
+
+# ==========================================
+# 共通のスタイル（Streamlit標準UIの非表示・導入エリア・フッター・発行ボタン）
+# ==========================================
+BASE_CSS = """
+/* 既存の非表示設定 */
+header {visibility: hidden !important; height: 0px !important;}
+footer {visibility: hidden !important; height: 0px !important;}
+[data-testid="stHeader"] {display: none !important;}
+[data-testid="stFooter"] {display: none !important;}
+div[class*="viewerBadge"] {visibility: hidden !important; display: none !important;}
+[data-testid="stToolbar"] {visibility: hidden !important; display: none !important;}
+.block-container {padding-top: 0rem !important; padding-bottom: 2rem !important;}
+.stApp > header {display: none !important;}
+
+/* ▼▼▼ 興味付けセクションのスタイル ▼▼▼ */
+.intro-box {
+    background-color: #fff0f5;
+    padding: 25px 20px;
+    border-radius: 15px;
+    margin-bottom: 25px;
+    text-align: center;
+    border: 2px solid #ffb6c1;
+    box-shadow: 0 2px 8px rgba(225, 0, 128, 0.1);
+}
+.intro-head {
+    color: #e10080;
+    font-weight: bold;
+    font-size: 1.3rem;
+    margin-bottom: 15px;
+    line-height: 1.4;
+}
+.intro-text {
+    color: #333;
+    font-size: 0.95rem;
+    line-height: 1.8;
+    max-width: 600px;
+    margin: 0 auto;
+}
+.intro-text .question {
+    color: #555;
+    font-size: 1rem;
+    margin: 8px 0;
+    display: block;
+}
+.intro-text strong {
+    color: #e10080;
+    font-weight: bold;
+}
+
+/* ▼▼▼ トップへ戻るリンク ▼▼▼ */
+.top-link {
+    text-align: center;
+    margin: 30px 0;
+    padding: 20px 0;
+}
+.top-link a {
+    color: #e10080;
+    text-decoration: underline;
+    font-size: 0.95rem;
+}
+.top-link a:hover {
+    color: #c1006e;
+}
+
+/* ▼▼▼ フッター（著作権表示） ▼▼▼ */
+.custom-footer {
+    text-align: center;
+    margin: 40px 0 20px 0;
+    padding: 30px 20px;
+    border-top: 1px solid #e0e0e0;
+    color: #666;
+    font-size: 0.9rem;
+    line-height: 1.8;
+}
+.custom-footer > div {
+    margin-bottom: 15px;
+}
+.custom-footer > div:last-child {
+    margin-bottom: 0;
+}
+.custom-footer strong {
+    display: block;
+    margin-bottom: 8px;
+    color: #333;
+    font-size: 0.95rem;
+}
+.custom-footer a {
+    color: #666;
+    text-decoration: none;
+    margin: 0 8px;
+    transition: color 0.3s ease;
+}
+.custom-footer a:hover {
+    color: #e10080;
+    text-decoration: underline;
+}
+.custom-footer .copyright {
+    margin-top: 20px;
+    padding-top: 15px;
+    border-top: 1px solid #e0e0e0;
+    color: #999;
+    font-size: 0.8rem;
+}
+
+/* ▼▼▼ 発行ボタンのスタイル ▼▼▼ */
+div[data-testid="stLinkButton"] > a,
+div[data-testid="stLinkButton"] > a button {
+    background-color: #e10080 !important;
+    color: white !important;
+    padding: 18px 30px !important;
+    font-size: 1.1rem !important;
+    font-weight: bold !important;
+    border-radius: 10px !important;
+    border: none !important;
+    width: 100% !important;
+    transition: all 0.3s ease !important;
+}
+div[data-testid="stLinkButton"] > a:hover,
+div[data-testid="stLinkButton"] > a button:hover {
+    background-color: #c1006e !important;
+    transform: translateY(-2px);
+    box-shadow: 0 4px 8px rgba(225, 0, 128, 0.3) !important;
+}
+"""
+
+TITLE_CSS = """
+.title-container {text-align: center; padding-bottom: 20px; border-bottom: 2px solid #C0A060; margin-bottom: 30px;}
+.main-title {font-family: "Helvetica", sans-serif; font-weight: bold; font-size: 2.5rem; background: linear-gradient(45deg, #FFB6C1, #C71585); -webkit-background-clip: text; -webkit-text-fill-color: transparent;}
+.sub-title {font-size: 1.2rem; color: #C0A060; font-weight: bold;}
+div.stButton > button {background-color: #C71585; color: white; border-radius: 10px; padding: 10px 20px; border:none;}
+"""
+
+# ==========================================
+# 鑑定結果カード・LINE登録カードのスタイル（スマホ最適化）
+# ==========================================
+RESULT_CSS = """
+/* 全体のカード枠 */
+.fortune-card {
+    background-color: #fff0f5;
+    border: 2px solid #ff69b4;
+    border-radius: 15px;
+    padding: 24px;
+    box-shadow: 0 4px 8px rgba(0,0,0,0.1);
+    margin-bottom: 20px;
+    font-family: "Helvetica Neue", Arial, "Hiragino Kaku Gothic ProN", "メイリオ", sans-serif;
+}
+/* タイトル部分 */
+.fortune-header {
+    color: #c71585;
+    font-size: 26px;
+    font-weight: bold;
+    text-align: center;
+    border-bottom: 2px dashed #ff69b4;
+    padding-bottom: 12px;
+    margin-bottom: 18px;
+}
+/* 本文部分 */
+.fortune-content {
+    color: #333333;
+    font-size: 18px;
+    line-height: 2.0;
+    white-space: pre-wrap;
+    word-break: break-word;
+}
+.fortune-content .fc-title,
+.fortune-content .fc-heading {
+    color: #c71585;
+    font-weight: bold;
+}
+.fortune-content .fc-rating {
+    color: #C0A060;
+    font-weight: bold;
+}
+/* フッター */
+.fortune-footer {
+    margin-top: 20px;
+    text-align: center;
+    font-size: 14px;
+    color: #888;
+}
+/* LINE登録カード */
+.line-card {
+    background: linear-gradient(135deg, #06C755 0%, #00B04F 100%);
+    border: 2px solid #06C755;
+    border-radius: 15px;
+    padding: 24px;
+    box-shadow: 0 4px 12px rgba(6, 199, 85, 0.3);
+    margin: 30px 0 20px 0;
+    text-align: center;
+    color: white;
+}
+.line-card-title {
+    font-size: 22px;
+    font-weight: bold;
+    margin-bottom: 12px;
+    color: white;
+}
+.line-card-text {
+    font-size: 16px;
+    line-height: 1.8;
+    margin-bottom: 16px;
+    color: white;
+}
+.line-card-price {
+    font-size: 20px;
+    font-weight: bold;
+    margin: 12px 0;
+    color: #FFD700;
+}
+.line-button {
+    display: inline-block;
+    background-color: white;
+    color: #06C755;
+    padding: 14px 32px;
+    border-radius: 25px;
+    text-decoration: none;
+    font-weight: bold;
+    font-size: 18px;
+    margin-top: 12px;
+    transition: transform 0.2s;
+    box-shadow: 0 4px 8px rgba(0,0,0,0.2);
+}
+.line-button:hover {
+    transform: scale(1.05);
+}
+/* スマホ対応 */
+@media (max-width: 600px) {
+    .fortune-card {
+        padding: 18px;
+        border-radius: 12px;
+    }
+    .fortune-header {
+        font-size: 24px;
+    }
+    .fortune-content {
+        font-size: 17px;
+        line-height: 1.9;
+    }
+    .line-card {
+        padding: 20px;
+    }
+    .line-card-title {
+        font-size: 20px;
+    }
+    .line-card-text {
+        font-size: 15px;
+    }
+    .line-card-price {
+        font-size: 18px;
+    }
+    .line-button {
+        padding: 12px 24px;
+        font-size: 16px;
+    }
+}
+"""
+
+BASE_STYLE = style_tag(BASE_CSS)
+RESULT_STYLE = style_tag(RESULT_CSS)
+
+LINE_CARD_HTML = minify_html("""
+<div class="line-card">
+    <div class="line-card-title">💬 もっと詳しく知りたい方はLINE登録</div>
+    <div class="line-card-text">
+        より詳しい鑑定や、個別の相談をご希望の方は<br>
+        公式LINEからお気軽にお問い合わせください
+    </div>
+    <div class="line-card-price">✨ LINE予約で20分2,980円から ✨</div>
+    <a href="https://lin.ee/2aPNobM" target="_blank" rel="noopener noreferrer" class="line-button">
+        📱 公式LINEを友だち追加
+    </a>
+</div>
+""")
+
+
+# ==========================================
+# 設定ごとの断片（設定オブジェクトごとにキャッシュ）
+# ==========================================
+@lru_cache(maxsize=16)
+def title_html(loaded_config):
+    config = loaded_config.data
+    return style_tag(TITLE_CSS) + minify_html(f"""
+<div class="title-container">
+    <div class="sub-title">{config.get("app_subtitle", "")}</div>
+    <div class="main-title">{config.get("app_main_title", "運勢鑑定書")}</div>
+</div>
+""")
+
+
+@lru_cache(maxsize=16)
+def intro_html(loaded_config):
+    """導入エリアの (開始部分, 導入文, 終了部分)。導入文がなければ None"""
+    config = loaded_config.data
+    questions_html = "".join(f'<span class="question">{q}</span>' for q in config.get("app_intro_questions", ()))
+    start = minify_html(f"""
+<div class="intro-box">
+    <div class="intro-head">{config.get("app_description", "")}</div>
+    <div class="intro-text">{questions_html}
+""")
+    intro_text = config.get("app_intro_text", "")
+    return start, (f"<br>{intro_text}" if intro_text else None), "</div></div>"
+
+
+@lru_cache(maxsize=16)
+def preview_link_html(loaded_config):
+    link_text = loaded_config.data.get("ui", {}).get("preview_link_text", "↓ 完全版鑑定書を見る ↓")
+    return minify_html(f"""
+<div style="text-align: center; margin: 20px 0;">
+    <a href="#完全版鑑定書" style="color: #e10080; text-decoration: none; font-weight: bold; font-size: 1.1rem; display: inline-block; padding: 10px 20px; background-color: #fff0f5; border-radius: 25px; border: 2px solid #e10080;">
+        {link_text}
+    </a>
+</div>
+""")
+
+
+@lru_cache(maxsize=16)
+def _fortune_card_parts(loaded_config):
+    head = minify_html("""
+<div class="fortune-card">
+    <div class="fortune-header">🔮 鑑定結果 🔮</div>
+    <div class="fortune-content">
+""")
+    tail = minify_html(f"""
+    </div>
+    <div class="fortune-footer">
+        screen shot this page to save<br>
+        Presented by {loaded_config.data.get('app_title', '運勢鑑定書')}
+    </div>
+</div>
+""")
+    return head, tail
+
+
+def fortune_card_html(loaded_config, content_html):
+    """鑑定結果カード（本文は uranai.document.render_html の出力。前後の固定部分だけをキャッシュする）"""
+    head, tail = _fortune_card_parts(loaded_config)
+    return head + content_html + tail
+
+
+@lru_cache(maxsize=16)
+def footer_html(loaded_config):
+    config = loaded_config.data
+    contact_email_url = config.get("contact_email_url", "")
+    contact_email = config.get("contact_email", contact_email_url.replace('mailto:', '').replace('https://', '').replace('http://', ''))
+    return minify_html(f"""
+<div class="custom-footer">
+    <div style="margin-bottom: 20px;">
+        <a href="{config.get("legal_url", "")}" target="_blank" rel="noopener noreferrer">特定商取引法に基づく表記</a>
+        <span style="margin: 0 8px; color: #ccc;">|</span>
+        <a href="{config.get("fortune_site_url", "")}" target="_blank" rel="noopener noreferrer">トップへ戻る</a>
+    </div>
+    <div style="margin-bottom: 15px;">
+        <strong>【サポート窓口】</strong>
+    </div>
+    <div style="margin-bottom: 10px;">
+        <span>メール: </span>
+        <a href="mailto:{contact_email}" style="color: #0066cc;">{contact_email}</a>
+    </div>
+    <div style="margin-bottom: 20px;">
+        <span>LINE: </span>
+        <a href="{config.get("contact_line_url", "")}" target="_blank" rel="noopener noreferrer" style="color: #0066cc;">公式LINEはこちら</a>
+    </div>
+    <div class="copyright">{config.get("copyright_text", "")}</div>
+</div>
+""")
@@ -0,0 +1,329 @@
+"""Google Apps Script（GAS）へのログ送信キュー
+
+リクエスト処理中に同期でGASへPOSTすると、GASの応答待ち（最大5秒）の間
+ユーザーの画面が止まってしまう。ここではイベントをプロセス内の上限付き
+キューに積むだけにして、バックグラウンドのワーカースレッドがまとめて
+1回のPOSTで送信する。送信に失敗したイベントはリトライ（指数バックオフ）
+し、それでも届かない場合はローカルのスプールファイルに退避して、次に
+送信が成功したときに再送する。
+
+スプールファイルは送信先のURLごとに分ける（別のURLのイベントを再送しない）。
+同じホストの複数のプロセス（uvicorn のワーカーなど）が同じファイルを使うため、
+追記は flock で排他し、再送するときはファイルを自分専用の名前に変えて
+（os.rename）から読む。再送中に他のプロセスが書いたイベントは元の名前の
+新しいファイルに入るため、失われない。
+
+送信形式:
+    1件のとき   {"action": ..., "name": ..., "dob": ..., "lp": ...}
+    複数件のとき {"events": [{...}, {...}, ...]}
+"""
+import atexit
+import fcntl
+import glob
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.request
+
+from uranai.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_DIR = "spool"
+# 再送のために取得したスプールファイルの名前（<スプール>.<pid>[-n].replaying）
+_CLAIM_SUFFIX = ".replaying"
+
+
+def spool_path_for(url, spool_dir=DEFAULT_SPOOL_DIR):
+    """送信先URLごとのスプールファイルのパス"""
+    url_hash = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(spool_dir, f"gas_events_{url_hash}.jsonl")
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class GasLogger:
+    """GASへのイベント送信をバックグラウンドで行うロガー（スレッドセーフ）
+
+    spool_path を省略すると URL ごとのスプールファイル（spool_path_for）を使う。
+    空文字列ならスプールしない（送れなかったイベントは捨てる）。
+    """
+
+    def __init__(self, url, spool_path=None, max_queue=1000, batch_size=50,
+                 flush_interval=1.0, timeout=5, max_retries=3, backoff=0.5,
+                 max_spool_bytes=5 * 1024 * 1024):
+        self.url = url
+        self.spool_path = spool_path_for(url) if spool_path is None else spool_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_spool_bytes = max_spool_bytes
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.counters = {
+            "queued": 0,    # キューに積んだ件数
+            "sent": 0,      # GASに届いた件数
+            "dropped": 0,   # キュー満杯・スプール上限で捨てた件数
+            "failed": 0,    # 失敗した送信（POST）回数
+            "spooled": 0,   # スプールに退避した件数
+            "replayed": 0,  # スプールから再送できた件数
+        }
+        self._worker = threading.Thread(target=self._run, name="gas-logger", daemon=True)
+        self._worker.start()
+
+    # ------------------------------------------
+    # 呼び出し側（リクエスト処理スレッド）
+    # ------------------------------------------
+    def log(self, event):
+        """イベントをキューに積む（ブロックしない）。積めなければ False"""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("queued")
+        return True
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats["pending"] = self._queue.qsize()
+        return stats
+
+    def flush(self, timeout=None):
+        """キューが空になり送信中のバッチがなくなるまで待つ。空になれば True"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # unfinished_tasks は put で増え、ワーカーの task_done で減る（送信中のバッチも含む）
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=2.0):
+        """残りを送信してからワーカーを止める"""
+        self.flush(timeout)
+        self._stop.set()
+        self._worker.join(timeout)
+
+    # ------------------------------------------
+    # ワーカースレッド
+    # ------------------------------------------
+    def _count(self, key, n=1):
+        with self._lock:
+            self.counters[key] += n
+
+    def _next_batch(self):
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                if self._send_with_retry(batch):
+                    self._count("sent", len(batch))
+                    self._replay_spool()
+                else:
+                    self._spool(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _post(self, events):
+        payload = events[0] if len(events) == 1 else {"events": events}
+        req = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with metrics.span("gas_post"), urllib.request.urlopen(req, timeout=self.timeout):
+            pass
+
+    def _send_with_retry(self, events):
+        for attempt in range(self.max_retries):
+            try:
+                self._post(events)
+                return True
+            except Exception as e:
+                self._count("failed")
+                logger.warning("GASへの送信に失敗しました（%d/%d回目）: %s", attempt + 1, self.max_retries, e)
+                if attempt + 1 < self.max_retries and self._stop.wait(self.backoff * (2 ** attempt)):
+                    break
+        return False
+
+    # ------------------------------------------
+    # スプール（GAS停止時の退避先）
+    # ------------------------------------------
+    def _open_spool(self):
+        """スプールファイルを追記用に開いて排他ロックを取る
+
+        開いてからロックを取るまでの間に再送側が名前を変えた場合は、
+        新しいファイルを開き直す（名前を変えたファイルには書かない）。
+        """
+        while True:
+            f = open(self.spool_path, "a", encoding="utf-8")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                if os.fstat(f.fileno()).st_ino == os.stat(self.spool_path).st_ino:
+                    return f
+            except FileNotFoundError:
+                pass
+            except BaseException:
+                f.close()
+                raise
+            f.close()
+
+    def _spool(self, events):
+        if not self.spool_path:
+            self._count("dropped", len(events))
+            return
+        try:
+            spool_dir = os.path.dirname(self.spool_path)
+            if spool_dir:
+                os.makedirs(spool_dir, exist_ok=True)
+            with self._open_spool() as f:
+                if f.tell() >= self.max_spool_bytes:
+                    self._count("dropped", len(events))
+                    return
+                for event in events:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self._count("spooled", len(events))
+        except OSError as e:
+            logger.warning("GASイベントのスプールに失敗しました: %s", e)
+            self._count("dropped", len(events))
+
+    def _claim_spool(self):
+        """再送するスプールファイルを自分専用の名前に変えて、そのパスの一覧を返す
+
+        再送の途中で終了したプロセスが残したファイルも引き取る。
+        """
+        pid = os.getpid()
+        claim_path = f"{self.spool_path}.{pid}{_CLAIM_SUFFIX}"
+        claimed = []
+        for path in glob.glob(f"{glob.escape(self.spool_path)}.*{_CLAIM_SUFFIX}"):
+            owner = path[len(self.spool_path) + 1:-len(_CLAIM_SUFFIX)].split("-")[0]
+            if owner.isdigit() and int(owner) != pid and not _pid_alive(int(owner)):
+                orphan_path = f"{self.spool_path}.{pid}-{len(claimed)}{_CLAIM_SUFFIX}"
+                try:
+                    os.rename(path, orphan_path)
+                except FileNotFoundError:
+                    continue
+                claimed.append(orphan_path)
+        if os.path.exists(self.spool_path):
+            with self._open_spool():
+                # ロック中に名前を変えるため、追記の途中のファイルは取らない
+                os.rename(self.spool_path, claim_path)
+            claimed.append(claim_path)
+        return claimed
+
+    def _replay_spool(self):
+        if not self.spool_path:
+            return
+        try:
+            claimed = self._claim_spool()
+        except OSError as e:
+            logger.warning("GASスプールの取得に失敗しました: %s", e)
+            return
+        for path in claimed:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    events = [json.loads(line) for line in f if line.strip()]
+            except (OSError, ValueError) as e:
+                logger.warning("GASスプールの読み込みに失敗しました: %s: %s", path, e)
+                continue
+            for i in range(0, len(events), self.batch_size):
+                chunk = events[i:i + self.batch_size]
+                if self._send_with_retry(chunk):
+                    self._count("replayed", len(chunk))
+                else:
+                    # 送れなかった残りは元のスプールに戻す
+                    self._spool(events[i:])
+                    break
+            os.remove(path)
+
+
+_loggers = {}
+_loggers_lock = threading.Lock()
+
+
+def get_gas_logger(url):
+    """URLごとにプロセス共通の GasLogger を返す
+
+    スプールの置き場所は環境変数 URANAI_GAS_SPOOL_DIR（既定は spool/）。
+    """
+    with _loggers_lock:
+        gas_logger = _loggers.get(url)
+        if gas_logger is None:
+            spool_dir = os.environ.get("URANAI_GAS_SPOOL_DIR") or DEFAULT_SPOOL_DIR
+            gas_logger = _loggers[url] = GasLogger(url, spool_path_for(url, spool_dir))
+        return gas_logger
+
+
+def save_data_via_gas(loaded_config, action_type, name, year, month, day, lp):
+    """設定ファイルのGAS URLへ送るイベントをキューに積む（GASの応答は待たない）
+
+    環境変数 URANAI_GAS_URL があれば、設定ファイルの gas_url の代わりにそちらへ送る
+    （負荷試験・ステージング環境用）。
+    """
+    gas_url = os.environ.get("URANAI_GAS_URL") or loaded_config.data.get("gas_url", "")
+
+    # URLが設定されていない場合は何もしない
+    if not gas_url:
+        return
+
+    get_gas_logger(gas_url).log({
+        "action": action_type,
+        "name": name,
+        "dob": f"{year}/{month}/{day}",
+        "lp": lp
+    })
+
+
+def _gas_samples():
+    """全ロガーの送信キューの統計（メトリクス用）"""
+    totals = {}
+    for gas_logger in list(_loggers.values()):
+        for key, value in gas_logger.stats().items():
+            totals[key] = totals.get(key, 0) + value
+    pending = totals.pop("pending", 0)
+    for key, value in totals.items():
+        yield "uranai_gas_events_total", "counter", {"result": key}, value
+    yield "uranai_gas_pending", "gauge", {}, pending
+
+
+metrics.add_collector(_gas_samples)
+
+
+@atexit.register
+def _flush_all():
+    for gas_logger in list(_loggers.values()):
+        gas_logger.close(timeout=2.0)
@@ -0,0 +1,155 @@
+"""鑑定結果の全件回帰テスト用コーパス（ゴールデン）
+
+使い方:
+    python -m uranai.golden --save            # 現在の出力で golden/corpus.json を作り直す
+    python -m uranai.golden                   # 現在の出力と golden/corpus.json を比較する
+    python -m uranai.golden --jobs 8 --config config_love.json
+
+フォームで選べる 1900〜2025年のすべての実在する生年月日について、CONFIG_MAP の
+設定ごとに固定のお名前・鑑定日（恋愛モードのシード）で鑑定結果の全文を作り、
+生年月日ごとの短いハッシュと設定ごとの全体のハッシュだけを保存する。
+年ごとにワーカープロセスへ振り分けて並列に計算する。
+
+比較では、まず設定ごとの全体のハッシュを比べ、異なる設定だけ生年月日ごとの
+ハッシュを比べて、変わった生年月日を表示する。差分があれば終了コード1を返す。
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+from uranai.config import CONFIG_MAP, get_config
+from uranai.numerology import TABLE_YEARS
+from uranai.reading import _compute_reading
+
+DEFAULT_CORPUS_PATH = os.path.join("golden", "corpus.json")
+GOLDEN_NAME = "花子"
+GOLDEN_TODAY = datetime(2026, 2, 1)
+SHORT_HASH_BYTES = 4   # 生年月日ごとのハッシュ（差分の場所を示すだけなので短くてよい）
+CORPUS_VERSION = 1
+
+
+def iter_dates(year):
+    """その年の実在する日付"""
+    day = date(year, 1, 1)
+    while day.year == year:
+        yield day
+        day += timedelta(days=1)
+
+
+def _year_hashes(config_file, year):
+    """1年分の生年月日ごとの鑑定結果の SHA-256"""
+    loaded_config = get_config(config_file)
+    return [hashlib.sha256(_compute_reading(loaded_config, GOLDEN_NAME, d.year, d.month, d.day,
+                                            GOLDEN_TODAY).text.encode("utf-8")).digest()
+            for d in iter_dates(year)]
+
+
+def build_corpus(config_files, jobs=None):
+    """設定ごとに全件の鑑定結果のハッシュを計算する"""
+    years = range(TABLE_YEARS[0], TABLE_YEARS[1] + 1)
+    corpus = {
+        "version": CORPUS_VERSION,
+        "name": GOLDEN_NAME,
+        "today": GOLDEN_TODAY.strftime("%Y-%m-%d"),
+        "years": list(TABLE_YEARS),
+        "configs": {},
+    }
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for config_file in config_files:
+            total = hashlib.sha256()
+            short = bytearray()
+            for digests in pool.map(_year_hashes, [config_file] * len(years), years):
+                for digest in digests:
+                    total.update(digest)
+                    short += digest[:SHORT_HASH_BYTES]
+            corpus["configs"][config_file] = {
+                "config_digest": get_config(config_file).digest,
+                "count": len(short) // SHORT_HASH_BYTES,
+                "digest": total.hexdigest(),
+                "hashes": base64.b64encode(bytes(short)).decode("ascii"),
+            }
+    return corpus
+
+
+def diff_corpus(expected, actual, limit=20):
+    """差分の説明の一覧（同じなら空）"""
+    messages = []
+    for key in ("version", "name", "today", "years"):
+        if expected.get(key) != actual.get(key):
+            messages.append(f"{key} が異なります: {expected.get(key)} → {actual.get(key)}")
+    if messages:
+        return messages
+
+    all_dates = [d for year in range(actual["years"][0], actual["years"][1] + 1) for d in iter_dates(year)]
+    for config_file, entry in actual["configs"].items():
+        golden = expected["configs"].get(config_file)
+        if golden is None:
+            messages.append(f"{config_file}: コーパスにありません（--save で追加してください）")
+            continue
+        if golden["digest"] == entry["digest"]:
+            continue
+        note = "（設定ファイルが変更されています）" if golden["config_digest"] != entry["config_digest"] else ""
+        old = base64.b64decode(golden["hashes"])
+        new = base64.b64decode(entry["hashes"])
+        changed = [all_dates[i // SHORT_HASH_BYTES] for i in range(0, len(new), SHORT_HASH_BYTES)
+                   if old[i:i + SHORT_HASH_BYTES] != new[i:i + SHORT_HASH_BYTES]]
+        messages.append(f"{config_file}: {len(changed)}件の鑑定結果が変わりました{note}")
+        messages += [f"  {d.isoformat()}" for d in changed[:limit]]
+        if len(changed) > limit:
+            messages.append(f"  ほか{len(changed) - limit}件")
+    return messages
+
+
+def default_config_files():
+    """CONFIG_MAP の設定のうち、ファイルが存在するもの"""
+    return [config_file for config_file in dict.fromkeys(CONFIG_MAP.values()) if os.path.exists(config_file)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m uranai.golden", description="鑑定結果の全件回帰テスト用コーパス")
+    parser.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS_PATH)
+    parser.add_argument("--save", action="store_true", help="現在の出力でコーパスを作り直す")
+    parser.add_argument("--config", action="append", dest="configs")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="ワーカープロセス数（既定：CPUコア数）")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    config_files = args.configs or default_config_files()
+    actual = build_corpus(config_files, args.jobs)
+    count = sum(entry["count"] for entry in actual["configs"].values())
+    print(f"{len(config_files)}設定・{count}件を {time.perf_counter() - start:.1f}秒で計算しました", file=sys.stderr)
+
+    if args.save:
+        # --config で一部の設定だけ作り直した場合は、ほかの設定の分を残す
+        if args.configs and os.path.exists(args.corpus):
+            with open(args.corpus, encoding="utf-8") as f:
+                previous = json.load(f)
+            if all(previous.get(key) == actual[key] for key in ("version", "name", "today", "years")):
+                actual["configs"] = dict(previous["configs"], **actual["configs"])
+        directory = os.path.dirname(args.corpus)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.corpus, "w", encoding="utf-8") as f:
+            json.dump(actual, f, ensure_ascii=False, indent=1)
+            f.write("\n")
+        print(f"保存しました: {args.corpus}")
+        return 0
+
+    with open(args.corpus, encoding="utf-8") as f:
+        expected = json.load(f)
+    messages = diff_corpus(expected, actual)
+    if messages:
+        print("\n".join(messages))
+        return 1
+    print("差分はありません")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""恋愛攻略モードの診断結果の選択"""
+import hashlib
+from datetime import datetime
+
+NO_RESULT_MESSAGE = "診断結果のデータが見つかりませんでした。"
+
+
+def date_seed(today=None):
+    """診断結果のシードに使う日付文字列（日付が変わると結果も変わる）"""
+    return (today or datetime.now()).strftime('%Y-%m-%d')
+
+
+def select_love_result(loaded_config, name, year, month, day, course="basic", today=None):
+    """ユーザー名と日付をシードにして results[course] から選ぶ結果の番号を返す（結果がなければ None）"""
+    # ユーザー名と日付を組み合わせてシードを作成
+    seed_string = f"{name}_{year}_{month}_{day}_{date_seed(today)}"
+    seed_hash = int(hashlib.md5(seed_string.encode()).hexdigest(), 16)
+
+    # 設定ファイルから結果リストを取得
+    course_results = loaded_config.data.get("results", {}).get(course, ())
+    if not course_results:
+        return None
+
+    # シードに基づいて結果を選択
+    return seed_hash % len(course_results)
+
+
+def get_love_diagnosis_result(loaded_config, name, year, month, day, course="basic", today=None):
+    """ユーザー名と日付をシードにして診断結果を選択（同じ日・同じ入力なら同じ結果）"""
+    index = select_love_result(loaded_config, name, year, month, day, course, today)
+    if index is None:
+        return NO_RESULT_MESSAGE
+    return loaded_config.data["results"][course][index]
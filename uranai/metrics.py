@@ -0,0 +1,288 @@
+"""処理時間・件数のメトリクス（Prometheus テキスト形式・定期ログ）
+
+画面の再実行やAPIの各段階（設定の読み込み・プレビュー・鑑定・描画・PDF・
+GAS送信など）を span() で囲み、段階ごとの所要時間をヒストグラムに集計する。
+件数は inc() で数える。キャッシュやGAS送信キューの統計は、出力のたびに
+各モジュールが登録したコレクターから読み取る。
+
+出力:
+    render_prometheus()   Prometheus テキスト形式（APIの /metrics）
+    summary_line()        1行の要約（定期ログ用）
+    record_phase()        起動直後の初回だけの処理の時間（uranai_startup_seconds）
+    start_exporters()     環境変数に応じてHTTPサーバー・定期ログを開始する
+        URANAI_METRICS_PORT          このポートで /metrics を公開する（Streamlitのプロセス用）
+        URANAI_METRICS_LOG_INTERVAL  この秒数ごとに要約をログに出す
+
+値はプロセスごとに集計される（複数ワーカーの場合はワーカーごと）。
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# 秒単位のヒストグラムの区切り（GASのタイムアウト5秒まで見えるように）
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = "uranai_stage_seconds"
+HELP = {
+    STAGE_SECONDS: "処理の段階ごとの所要時間（秒）",
+    "uranai_previews_total": "無料プレビューの件数",
+    "uranai_purchases_total": "購入・発行の件数",
+    "uranai_purchase_reloads_total": "記録済みの購入の再読み込みの件数",
+    "uranai_errors_total": "処理中のエラーの件数",
+    "uranai_api_requests_total": "APIリクエストの件数",
+    "uranai_gas_events_total": "GASへのログ送信キューの件数（状態別）",
+    "uranai_gas_pending": "GASへの送信待ちの件数",
+    "uranai_cache_total": "鑑定結果キャッシュの件数（結果別）",
+    "uranai_cache_size": "鑑定結果キャッシュの保持件数",
+    "uranai_startup_seconds": "起動直後の初回だけかかる処理の所要時間（秒）",
+}
+
+
+class Histogram:
+    """累積ではない区切りごとの件数・合計・件数を持つヒストグラム"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """q分位点のおおよその値（その値を含む区切りの上限）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Metrics:
+    """カウンターとヒストグラムの集計先（スレッドセーフ）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """with ブロックの所要時間を stage ごとに記録する（例外時も記録する）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(STAGE_SECONDS, time.perf_counter() - start, stage=stage, **labels)
+
+    def add_collector(self, collector):
+        """出力時に呼ばれ、(名前, 種類, ラベルのdict, 値) を返す関数を登録する"""
+        self._collectors.append(collector)
+
+    def _collected(self):
+        samples = []
+        for collector in self._collectors:
+            try:
+                samples.extend(collector())
+            except Exception as e:
+                logger.warning("メトリクスの収集に失敗しました: %s", e)
+        return samples
+
+    def render_prometheus(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(h.counts), h.sum, h.count)) for key, h in self._histograms.items())
+
+        families = {}
+        for (name, labels), value in counters:
+            families.setdefault((name, "counter"), []).append(f"{name}{_format_labels(labels)} {value}")
+        for name, kind, labels, value in self._collected():
+            labels = tuple(sorted(labels.items()))
+            families.setdefault((name, kind), []).append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), (counts, total, count) in histograms:
+            lines = families.setdefault((name, "histogram"), [])
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        out = []
+        for (name, kind), lines in families.items():
+            if name in HELP:
+                out.append(f"# HELP {name} {HELP[name]}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(lines)
+        return "\n".join(out) + "\n"
+
+    def summary_line(self):
+        """段階ごとの件数・平均・p95と、カウンターの1行要約"""
+        with self._lock:
+            parts = []
+            for (name, labels), h in sorted(self._histograms.items()):
+                if name != STAGE_SECONDS or not h.count:
+                    continue
+                values = dict(labels)
+                stage = "/".join([str(values.pop("stage", ""))] + [str(value) for value in values.values()])
+                parts.append(f"{stage} n={h.count} avg={h.sum / h.count * 1000:.1f}ms p95<={h.quantile(0.95) * 1000:g}ms")
+            for (name, labels), value in sorted(self._counters.items()):
+                label_text = ",".join(str(v) for _, v in labels)
+                parts.append(f"{name.replace('uranai_', '')}{'[' + label_text + ']' if label_text else ''}={value}")
+        return " | ".join(parts) or "メトリクスなし"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+# プロセス共通の集計先
+metrics = Metrics()
+span = metrics.span
+inc = metrics.inc
+
+
+# ==========================================
+# 起動時間（プロセスで初回だけの処理）
+# ==========================================
+_phases = {}
+_phases_lock = threading.Lock()
+
+
+def record_phase(phase, seconds):
+    """起動時の段階（imports・config_load・font_check など）の所要時間を記録する（最初の1回だけ）"""
+    with _phases_lock:
+        if phase in _phases:
+            return
+        _phases[phase] = seconds
+    logger.info("startup: %s %.1fms", phase, seconds * 1000)
+
+
+@contextmanager
+def startup_phase(phase):
+    """with ブロックの所要時間を起動時の段階として記録する（2回目以降は記録しない）"""
+    if phase in _phases:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - start)
+
+
+def startup_phases():
+    with _phases_lock:
+        return dict(_phases)
+
+
+def _startup_samples():
+    for phase, seconds in startup_phases().items():
+        yield "uranai_startup_seconds", "gauge", {"phase": phase}, seconds
+
+
+metrics.add_collector(_startup_samples)
+
+
+def _cache_samples():
+    from uranai.cache import cache_stats
+    for cache_name, stats in cache_stats().items():
+        for key in ("hits", "misses", "evictions", "expired"):
+            yield "uranai_cache_total", "counter", {"cache": cache_name, "result": key}, stats[key]
+        yield "uranai_cache_size", "gauge", {"cache": cache_name}, stats["size"]
+
+
+metrics.add_collector(_cache_samples)
+
+
+# ==========================================
+# 出力（HTTP・定期ログ）
+# ==========================================
+def serve(port, host="0.0.0.0"):
+    """/metrics を返すHTTPサーバーをバックグラウンドで起動する"""
+    # http.server は公開するときだけ読み込む（起動時間を短くするため）
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def start_log_reporter(interval):
+    """interval 秒ごとに要約をログに出すスレッドを起動する"""
+    def report():
+        while True:
+            time.sleep(interval)
+            logger.info("metrics: %s", metrics.summary_line())
+    threading.Thread(target=report, name="metrics-log", daemon=True).start()
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    """環境変数に応じてHTTPサーバー・定期ログを開始する（プロセスで1回だけ）"""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+        port = os.environ.get("URANAI_METRICS_PORT")
+        if port:
+            try:
+                serve(int(port))
+            except OSError as e:
+                logger.warning("メトリクスのHTTPサーバーを起動できませんでした（ポート %s）: %s", port, e)
+        interval = os.environ.get("URANAI_METRICS_LOG_INTERVAL")
+        if interval:
+            start_log_reporter(float(interval))
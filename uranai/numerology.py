@@ -0,0 +1,60 @@
+"""数秘術（ライフパスナンバー）の計算"""
+from functools import lru_cache
+
+MASTER_NUMBERS = (11, 22, 33)
+
+
+def calculate_life_path_number(year, month, day):
+    def sum_digits(n):
+        while n >= 10: n = sum(int(d) for d in str(n))
+        return n
+    total = sum_digits(year) + sum_digits(month) + sum_digits(day)
+    lp = sum_digits(total)
+    return total if total in MASTER_NUMBERS else lp
+
+
+# ==========================================
+# 一括計算（分析・一括発行向け、NumPyを使用）
+# ==========================================
+# 事前計算する範囲（入力フォームと同じ 1900〜2025年）
+TABLE_YEARS = (1900, 2025)
+
+
+def _digit_root(n, np):
+    # sum_digits と同じ：10未満はそのまま、それ以外は各桁の和を1桁になるまで繰り返した値
+    return np.where(n < 10, n, 1 + (n - 1) % 9)
+
+
+def life_path_numbers(years, months, days):
+    """(年, 月, 日) の配列からライフパスナンバーの配列を求める
+
+    calculate_life_path_number と同じ結果になる（マスターナンバーの扱いも同じ）。
+    """
+    import numpy as np
+
+    years, months, days = (np.asarray(a, dtype=np.int64) for a in (years, months, days))
+    total = _digit_root(years, np) + _digit_root(months, np) + _digit_root(days, np)
+    return np.where(np.isin(total, MASTER_NUMBERS), total, _digit_root(total, np))
+
+
+@lru_cache(maxsize=1)
+def life_path_table():
+    """TABLE_YEARS の全日付のライフパスナンバー表
+
+    table[year - 1900, month - 1, day - 1] で引ける（形は (126, 12, 31)）。
+    フォームと同じく日は1〜31のすべてを含む（存在しない日付も計算式どおりの値）。
+    """
+    import numpy as np
+
+    first, last = TABLE_YEARS
+    years, months, days = np.meshgrid(np.arange(first, last + 1), np.arange(1, 13), np.arange(1, 32), indexing="ij")
+    table = life_path_numbers(years, months, days).astype(np.uint8)
+    table.flags.writeable = False
+    return table
+
+
+def lookup_life_path_number(year, month, day):
+    """事前計算した表からライフパスナンバーを引く（表の範囲外は calculate_life_path_number で計算）"""
+    if TABLE_YEARS[0] <= year <= TABLE_YEARS[1] and 1 <= month <= 12 and 1 <= day <= 31:
+        return int(life_path_table()[year - TABLE_YEARS[0], month - 1, day - 1])
+    return calculate_life_path_number(year, month, day)
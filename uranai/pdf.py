@@ -0,0 +1,194 @@
+"""A4鑑定書PDFの生成エンジン
+
+フォントはプロセスで1回だけ登録したものを共有し（uranai.fonts）、
+PDFはメモリ上のバッファに描画してバイト列で返す。
+"""
+import io
+from datetime import datetime
+
+from reportlab.lib.colors import HexColor
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+
+from uranai.fonts import FALLBACK_FONT_NAME, pdf_font_name
+from uranai.document import TEXT_ONLY_KINDS, build_document
+from uranai.wrap import glyph_widths, wrap_lines
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN_X = 56
+MARGIN_TOP = 64
+MARGIN_BOTTOM = 56
+CONTENT_WIDTH = PAGE_WIDTH - MARGIN_X * 2
+
+COLOR_TEXT = HexColor("#333333")
+COLOR_PINK = HexColor("#C71585")
+COLOR_LIGHT_PINK = HexColor("#FFF0F5")
+COLOR_GOLD = HexColor("#C0A060")
+COLOR_MUTED = HexColor("#888888")
+
+BODY_SIZE = 10.5
+BODY_LEADING = 17
+
+
+# ==========================================
+# テキスト折り返し
+# ==========================================
+def wrap_text(text, font_name, font_size, max_width):
+    """テキストを最大幅で折り返した行のリストを返す（改行は段落区切りとして扱う）"""
+    return wrap_lines(text, max_width, glyph_widths(font_name, font_size))
+
+
+def draw_wrapped_text(c, text, x, y, max_width, font_name, font_size, line_height, color=COLOR_TEXT):
+    c.setFillColor(color)
+    c.setFont(font_name, font_size)
+    for line in wrap_text(text, font_name, font_size, max_width):
+        if y < 30: break
+        c.drawString(x, y, line); y -= line_height
+    return y
+
+
+def _drawable(text, font_name):
+    """フォントに字形がない文字（絵文字など）を取り除く"""
+    if font_name == FALLBACK_FONT_NAME:
+        return text
+    char_to_glyph = pdfmetrics.getFont(font_name).face.charToGlyph
+    return "".join(ch for ch in text if ch == "\n" or ord(ch) in char_to_glyph).strip(" ")
+
+
+# ==========================================
+# ページレイアウト
+# ==========================================
+class PdfLayout:
+    """上から下へ順に描画し、ページ下端に達したら自動で改ページする"""
+
+    def __init__(self, c, font_name):
+        self.c = c
+        self.font_name = font_name
+        self.page = 0
+        self._start_page()
+
+    def _start_page(self):
+        c = self.c
+        self.page += 1
+        c.setFillColor(COLOR_LIGHT_PINK)
+        c.rect(0, 0, PAGE_WIDTH, PAGE_HEIGHT, stroke=0, fill=1)
+        c.setStrokeColor(COLOR_GOLD)
+        c.setLineWidth(2)
+        c.rect(20, 20, PAGE_WIDTH - 40, PAGE_HEIGHT - 40, stroke=1, fill=0)
+        c.setStrokeColor(COLOR_PINK)
+        c.setLineWidth(0.5)
+        c.rect(26, 26, PAGE_WIDTH - 52, PAGE_HEIGHT - 52, stroke=1, fill=0)
+        self.y = PAGE_HEIGHT - MARGIN_TOP
+
+    def ensure(self, height):
+        """残りの高さが足りなければ改ページする（改ページしたら True）"""
+        if self.y - height < MARGIN_BOTTOM:
+            self.c.showPage()
+            self._start_page()
+            return True
+        return False
+
+    def space(self, height):
+        self.y -= height
+
+    def centered(self, text, font_size, color=COLOR_TEXT):
+        text = _drawable(text, self.font_name)
+        self.ensure(font_size * 1.6)
+        self.c.setFillColor(color)
+        self.c.setFont(self.font_name, font_size)
+        self.c.drawCentredString(PAGE_WIDTH / 2, self.y, text)
+        self.y -= font_size * 1.6
+
+    def rule(self, color=COLOR_GOLD):
+        self.ensure(12)
+        self.c.setStrokeColor(color)
+        self.c.setLineWidth(1)
+        self.c.line(MARGIN_X, self.y + 4, PAGE_WIDTH - MARGIN_X, self.y + 4)
+        self.y -= 12
+
+    def heading(self, text):
+        self.ensure(BODY_LEADING * 3)
+        self.space(6)
+        self.paragraph(text, font_size=13, leading=20, color=COLOR_PINK)
+
+    def paragraph(self, text, font_size=BODY_SIZE, leading=BODY_LEADING, color=COLOR_TEXT):
+        text = _drawable(text, self.font_name)
+        self.c.setFillColor(color)
+        self.c.setFont(self.font_name, font_size)
+        for line in wrap_text(text, self.font_name, font_size, CONTENT_WIDTH):
+            if self.ensure(leading):
+                # showPage() で描画状態がリセットされるため、改ページ直後は設定し直す
+                self.c.setFillColor(color)
+                self.c.setFont(self.font_name, font_size)
+            self.c.drawString(MARGIN_X, self.y, line)
+            self.y -= leading
+
+
+# ==========================================
+# 鑑定書の組み立て
+# ==========================================
+def _draw_header(layout, document):
+    template = document.template
+    layout.centered(template.pdf_title, 20, COLOR_PINK)
+    layout.space(4)
+    layout.centered(f"{document.name} {template.name_suffix}", 16)
+    layout.centered(f"{template.birth_date_label} {document.year}年{document.month}月{document.day}日", 11, COLOR_MUTED)
+    layout.rule()
+
+
+def _draw_footer(layout, document):
+    layout.space(10)
+    layout.rule()
+    for text, font_size, leading in document.template.footer_lines:
+        layout.paragraph(text, font_size, leading, COLOR_MUTED)
+
+
+def _draw_blocks(layout, blocks):
+    for block in blocks:
+        kind = block.kind
+        if kind in TEXT_ONLY_KINDS:
+            continue
+        if kind in ("heading", "pdf_heading"):
+            layout.heading(block.text)
+        elif kind == "lp":
+            layout.paragraph(block.text, 14, 22, COLOR_GOLD)
+        elif kind == "rating":
+            layout.paragraph(block.text, 13, 20, COLOR_GOLD)
+        elif kind == "meta":
+            layout.paragraph(block.text, 11, 17, COLOR_MUTED)
+        elif kind == "small":
+            layout.paragraph(block.text, 10, 16)
+        elif kind == "gap":
+            layout.space(6)
+        else:
+            layout.paragraph(block.text)
+
+
+def render_pdf(document):
+    """文書（uranai.document.Document）から鑑定書PDFを生成してバイト列で返す"""
+    font_name = pdf_font_name()
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+    c.setTitle(f"{document.template.pdf_title} - {document.name}")
+    c.setAuthor(document.template.author)
+
+    layout = PdfLayout(c, font_name)
+    _draw_header(layout, document)
+    _draw_blocks(layout, document.blocks)
+    _draw_footer(layout, document)
+
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def create_pdf(loaded_config, name, year, month, day, lp=None, diagnosis_text=None, today=None):
+    """鑑定書PDFを生成してバイト列で返す
+
+    通常モードは lp（ライフパスナンバー）から運勢テーブルを引き、
+    恋愛モードは diagnosis_text（診断結果）をそのまま本文にする。
+    """
+    document = build_document(loaded_config, name, year, month, day, today or datetime.now(),
+                              lp=lp, diagnosis_text=diagnosis_text)
+    return render_pdf(document)
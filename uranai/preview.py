@@ -0,0 +1,80 @@
+"""無料プレビュー（鑑定結果の一部）の組み立て"""
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from uranai.config import LOVE_PREVIEW_COURSE
+from uranai.document import compile_template
+from uranai.fortune import Overall, Rating, get_fortune_data
+from uranai.love import NO_RESULT_MESSAGE, select_love_result
+from uranai.numerology import calculate_life_path_number
+
+LOVE_MODE_LP = "love_mode"
+# 設定ファイルの ui に preview_section_title / preview_warning がないときの文言
+DEFAULT_SECTION_TITLES = {
+    "love": "💘 気になる診断結果",
+    "normal": "💫 気になる運勢の一部",
+}
+DEFAULT_WARNINGS = {
+    "love": "🔒 詳しい戦略アドバイス（Xデー・具体的な作戦・タイミング分析など）をご覧になるには、完全版の購入が必要です。",
+    "normal": "🔒 詳しい結果（全運勢・月別カレンダー・ラッキーアイテムなど）をご覧になるには、完全版の購入が必要です。",
+}
+
+
+class Preview(NamedTuple):
+    """1人分の無料プレビュー（表示用の文言まで組み立て済み）"""
+    mode: str
+    title: str
+    log_lp: object                   # GASログに記録する値（ライフパスナンバー or "love_mode"）
+    lp: Optional[int] = None         # 以下、通常モードのみ
+    lp_label: str = ""
+    subtitle: str = ""
+    overall_label: str = ""
+    overall: Optional[Overall] = None
+    love_label: str = ""
+    love: Optional[Rating] = None
+    text: Optional[str] = None       # 恋愛モードのみ：診断結果の冒頭部分
+
+
+def preview_title(loaded_config, name):
+    ui_config = loaded_config.data.get("ui", {})
+    fortune_year = compile_template(loaded_config).fortune_year
+    return ui_config.get("preview_success_title_template", "{name} 様の{year}運勢").format(name=name, year=fortune_year)
+
+
+def preview_section_title(loaded_config):
+    return loaded_config.data.get("ui", {}).get("preview_section_title", DEFAULT_SECTION_TITLES[loaded_config.mode])
+
+
+def preview_warning(loaded_config):
+    return loaded_config.data.get("ui", {}).get("preview_warning", DEFAULT_WARNINGS[loaded_config.mode])
+
+
+def compute_preview(loaded_config, name, year, month, day, today=None):
+    """設定のモードに応じて無料プレビューを作る"""
+    title = preview_title(loaded_config, name)
+
+    if loaded_config.mode == "love":
+        # 恋愛攻略モード：resultsから選択した診断結果の一部
+        index = select_love_result(loaded_config, name, year, month, day, LOVE_PREVIEW_COURSE, today or datetime.now())
+        text = NO_RESULT_MESSAGE if index is None else loaded_config.love_previews[index]
+        return Preview("love", title, LOVE_MODE_LP, text=text)
+
+    # 通常モード：数秘術ロジック
+    return normal_preview(loaded_config, title, calculate_life_path_number(year, month, day))
+
+
+def normal_preview(loaded_config, title, lp):
+    """通常モードのライフパスナンバー lp のプレビュー（お名前は title にだけ入る）"""
+    ui_config = loaded_config.data.get("ui", {})
+    template = compile_template(loaded_config)
+    data = get_fortune_data(loaded_config, lp)
+    return Preview(
+        "normal", title, lp,
+        lp=lp,
+        lp_label=template.lp_label,
+        subtitle=ui_config.get("preview_success_subtitle_template", "✨ あなたの{year}はこんな年に！").format(year=template.fortune_year),
+        overall_label=template.plain_section_titles["overall"],
+        overall=data["overall"],
+        love_label=template.plain_section_titles["love"],
+        love=data["love"],
+    )
@@ -0,0 +1,115 @@
+"""発行済みの鑑定結果の記録（SQLite）
+
+決済後のリダイレクトURL（paid=true&name=...）を再読み込みすると、新しい
+セッションとして鑑定をやり直し、GASに「購入・発行」をもう一度記録してしまう。
+ここでは購入ごとの識別子をキーに、発行した鑑定結果の鍵（ReadingKey）を
+ローカルのSQLiteに1回だけ記録し、再読み込み・再ダウンロードはそこから返す。
+
+購入の識別子:
+    URLの session_id（Stripeの {CHECKOUT_SESSION_ID}）を使う。session_id がなければ
+    記録しない（同じお名前・生年月日の別の方の購入をまとめてしまわないよう、毎回
+    新しい購入として扱う）。
+
+保存先は環境変数 URANAI_PURCHASE_DB（既定は data/purchases.sqlite3）。
+SQLiteのロックにより、複数のプロセス・スレッドから同時に使える。
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from uranai.reading import ReadingKey
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join("data", "purchases.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS purchases (
+    purchase_id TEXT PRIMARY KEY,
+    reading_key TEXT NOT NULL,
+    created_at  REAL NOT NULL
+)
+"""
+
+
+def purchase_id(session_id):
+    """購入の識別子（session_id がなければ None：購入を区別できないため記録しない）"""
+    return f"session:{session_id}" if session_id else None
+
+
+class PurchaseStore:
+    """購入の識別子 → ReadingKey の記録（スレッドセーフ）"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get(self, purchase_id):
+        """記録済みの ReadingKey（なければ None）"""
+        if purchase_id is None:
+            return None
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT reading_key FROM purchases WHERE purchase_id = ?", (purchase_id,)).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("購入記録の読み込みに失敗しました: %s", e)
+            return None
+        if row is None:
+            return None
+        values = json.loads(row[0])
+        if len(values) != len(ReadingKey._fields):
+            # 鍵の形式が変わる前の記録（設定の digest がない）。新しい購入と同じに扱う
+            return None
+        return ReadingKey(*values)
+
+    def add(self, purchase_id, key):
+        """初めての購入なら記録して True。既に記録済みなら何もせず False
+
+        記録できなかった場合・識別子がない場合は、購入のログを取りこぼさないよう True を返す。
+        """
+        if purchase_id is None:
+            return True
+        try:
+            with self._lock:
+                cursor = self._connect().execute(
+                    "INSERT OR IGNORE INTO purchases (purchase_id, reading_key, created_at) VALUES (?, ?, ?)",
+                    (purchase_id, json.dumps(list(key), ensure_ascii=False), time.time()))
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("購入記録の保存に失敗しました: %s", e)
+            return True
+        return cursor.rowcount == 1
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_purchase_store():
+    """プロセス共通の PurchaseStore を返す"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PurchaseStore(os.environ.get("URANAI_PURCHASE_DB", DEFAULT_DB_PATH))
+        return _store
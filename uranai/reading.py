@@ -0,0 +1,127 @@
+"""購入後に発行する鑑定結果（全文）の組み立て"""
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from uranai.cache import readings
+from uranai.config import ConfigError, get_config
+from uranai.document import Document, build_document, render_text
+from uranai.love import date_seed, get_love_diagnosis_result, select_love_result
+from uranai.numerology import calculate_life_path_number
+
+
+class Reading(NamedTuple):
+    """1人分の鑑定結果"""
+    name: str
+    year: int
+    month: int
+    day: int
+    today: datetime
+    lp: Optional[int]              # 通常モードのライフパスナンバー
+    diagnosis_text: Optional[str]  # 恋愛モードの診断結果
+    text: str                      # 画面・テキスト保存用の全文
+    document: Document             # テキスト・カード・PDFの元になる文書
+
+
+def compute_reading(loaded_config, name, year, month, day, today=None):
+    """設定のモードに応じて鑑定結果を作る（today は恋愛モードのシード・鑑定日）
+
+    同じ日の同じ入力に対する結果はキャッシュから返す。
+    """
+    today = today or datetime.now()
+    return readings.get((loaded_config.digest, name, year, month, day), date_seed(today),
+                        lambda: _compute_reading(loaded_config, name, year, month, day, today))
+
+
+def _compute_reading(loaded_config, name, year, month, day, today):
+    if loaded_config.mode == "love":
+        lp = None
+        diagnosis_result = get_love_diagnosis_result(loaded_config, name, year, month, day, "basic", today)
+    else:
+        lp = calculate_life_path_number(year, month, day)
+        diagnosis_result = None
+    document = build_document(loaded_config, name, year, month, day, today, lp=lp, diagnosis_text=diagnosis_result)
+    return Reading(name, year, month, day, today, lp, diagnosis_result, render_text(document), document)
+
+
+class ReadingKey(NamedTuple):
+    """セッションに保存する鑑定結果の鍵（本文は保存せず、必要なときに作り直す）"""
+    config_path: str
+    config_digest: str       # 鑑定したときの設定の digest
+    name: str
+    year: int
+    month: int
+    day: int
+    date: str                # 鑑定日（YYYY-MM-DD、恋愛モードのシード）
+    result: Optional[int]    # 通常モードのライフパスナンバー／恋愛モードの結果の番号
+
+
+def reading_key(loaded_config, reading):
+    if reading.lp is not None:
+        result = reading.lp
+    else:
+        result = select_love_result(loaded_config, reading.name, reading.year, reading.month, reading.day,
+                                    "basic", reading.today)
+    return ReadingKey(loaded_config.path, loaded_config.digest, reading.name, reading.year, reading.month, reading.day,
+                      date_seed(reading.today), result)
+
+
+def load_reading(key):
+    """鍵から (設定, 鑑定結果) を作り直す（鑑定日は保存した日付を使うため、日付が変わっても同じ結果）
+
+    鑑定のあとで設定が変わった場合は、保存したライフパスナンバー／結果の番号を
+    今の設定に当てはめる（選び直すと購入したときと別の結果になるため）。
+    """
+    loaded_config = get_config(key.config_path)
+    today = datetime.strptime(key.date, "%Y-%m-%d")
+    if loaded_config.digest == key.config_digest:
+        return loaded_config, compute_reading(loaded_config, key.name, key.year, key.month, key.day, today)
+    return loaded_config, _reading_from_result(loaded_config, key, today)
+
+
+def _reading_from_result(loaded_config, key, today):
+    if key.result is None:
+        raise ConfigError(loaded_config.path, "鑑定結果の番号が保存されていないため、変更後の設定では作り直せません")
+    if loaded_config.mode == "love":
+        course_results = loaded_config.data["results"]["basic"]
+        if not 0 <= key.result < len(course_results):
+            raise ConfigError(loaded_config.path,
+                              f"鑑定結果の番号 {key.result} が results['basic'] にありません（設定が変更されました）")
+        lp, diagnosis_result = None, course_results[key.result]
+    else:
+        lp, diagnosis_result = key.result, None
+    document = build_document(loaded_config, key.name, key.year, key.month, key.day, today,
+                              lp=lp, diagnosis_text=diagnosis_result)
+    return Reading(key.name, key.year, key.month, key.day, today, lp, diagnosis_result,
+                   render_text(document), document)
+
+
+def reading_pdf(loaded_config, reading):
+    """鑑定結果からPDF鑑定書を作る"""
+    # reportlab の読み込みは重いため、PDFを作るときだけ読み込む
+    from uranai.pdf import render_pdf
+    return render_pdf(reading.document)
+
+
+def reading_text_bytes(reading):
+    """テキスト保存用のバイト列（BOM付きUTF-8。Windowsのメモ帳などでも文字化けしない）"""
+    return reading.text.encode("utf-8-sig")
+
+
+def reading_download(loaded_config, reading, output_format):
+    """ダウンロード用のバイト列（"pdf" / "txt"）
+
+    同じ設定・入力・日付・形式の内容はディスクキャッシュ（uranai.document_cache）から返し、
+    なければ作って保存する。
+    """
+    from uranai.document_cache import document_key, get_document_cache
+    if output_format == "pdf":
+        from uranai.fonts import registered_font_digest
+        # 使うフォント（サブセット・手動で配置したもの・作り直したもの）でPDFの中身が変わる
+        variant = registered_font_digest()
+        render = lambda: reading_pdf(loaded_config, reading)  # noqa: E731
+    else:
+        variant = ""
+        render = lambda: reading_text_bytes(reading)  # noqa: E731
+    key = document_key(loaded_config.digest, reading.name, reading.year, reading.month, reading.day,
+                       date_seed(reading.today), output_format, variant)
+    return get_document_cache().get_or_render(key, render)
@@ -0,0 +1,142 @@
+"""無料プレビューの静的ファイル書き出し（WordPressのLP用）
+
+使い方:
+    python -m uranai.static_preview -o static_previews/ [--config love ...]
+
+無料プレビューの中身は、通常モードではライフパスナンバー（12種類）、恋愛モードでは
+results のプレビュー対象コースの件数分しかない。設定ごとにすべてのプレビューを
+あらかじめ縮小済みのHTMLにして書き出し、LP（valentine_landing_page.html など）が
+CDNから取得してブラウザ側で選んで表示できるようにする。Streamlitのセッションを
+使わないため、プレビューだけの訪問者はアプリのサーバーに来ない。
+
+出力（<短縮名> は CONFIG_MAP のキー。default / love など）:
+    <短縮名>.json          プレビュー全件と、選び方・見出しなどの設定
+    <短縮名>/lp-<n>.html   通常モード：ライフパスナンバー n のプレビュー
+    <短縮名>/result-<i>.html 恋愛モード：results の i 番目のプレビュー
+    uranai_preview.js      ブラウザ側で結果を選んで表示するスクリプト
+
+恋愛モードの選び方はアプリと同じ（お名前・生年月日・日付の MD5、uranai.love）。
+日付はアプリのサーバーの時刻で決まるため、サーバーのUTCからの時差を
+--seed-utc-offset（分）で指定する（既定は0。Heroku などUTCで動くサーバー）。
+書き出したマシンの時差は使わない（JSTのPCで書き出すと1日のうち9時間アプリと結果がずれる）。
+"""
+import argparse
+import html
+import json
+import os
+import shutil
+import sys
+
+from uranai.config import CONFIG_MAP, get_config
+from uranai.fortune import LIFE_PATH_NUMBERS
+from uranai.fragments import minify_html
+from uranai.preview import normal_preview, preview_section_title, preview_title, preview_warning
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uranai_preview.js")
+NAME_PLACEHOLDER = "{name}"
+MANIFEST_VERSION = 1
+
+
+def _paragraphs(text):
+    """空行区切りの段落を <p>、段落内の改行を <br> にする"""
+    return "".join(f"<p>{html.escape(part).replace(chr(10), '<br>')}</p>" for part in text.split("\n\n") if part)
+
+
+def normal_variant_html(loaded_config, lp):
+    preview = normal_preview(loaded_config, "", lp)
+    return minify_html(f"""
+<div class="uranai-preview" data-lp="{lp}">
+    <p class="uranai-preview-lp"><strong>{html.escape(preview.lp_label)} {lp}</strong></p>
+    <h4>{html.escape(preview.subtitle)}</h4>
+    <p><strong>{html.escape(preview.overall_label)}: {html.escape(preview.overall.rank)}</strong></p>
+    {_paragraphs(preview.overall.description)}
+    <h4>{html.escape(preview_section_title(loaded_config))}</h4>
+    <p><strong>{html.escape(preview.love_label)}</strong>: {preview.love.star_text}</p>
+    {_paragraphs(preview.love.description)}
+    <p class="uranai-preview-warning">{html.escape(preview_warning(loaded_config))}</p>
+</div>
+""")
+
+
+def love_variant_html(loaded_config, index, preview_text):
+    return minify_html(f"""
+<div class="uranai-preview" data-result="{index}">
+    <h4>{html.escape(preview_section_title(loaded_config))}</h4>
+    <div class="uranai-preview-text">{_paragraphs(preview_text)}</div>
+    <p class="uranai-preview-warning">{html.escape(preview_warning(loaded_config))}</p>
+</div>
+""")
+
+
+def build_manifest(loaded_config, seed_utc_offset):
+    """1設定分のプレビュー全件と表示に必要な設定"""
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "mode": loaded_config.mode,
+        "config_digest": loaded_config.digest,
+        # {name} をブラウザ側でお名前（エスケープ済み）に置き換える
+        "title_template": html.escape(preview_title(loaded_config, NAME_PLACEHOLDER)),
+    }
+    if loaded_config.mode == "love":
+        # シードは「お名前_年_月_日_日付」の MD5（uranai.love.select_love_result と同じ）
+        manifest["selection"] = {"method": "md5", "date_utc_offset_minutes": seed_utc_offset}
+        manifest["variants"] = [love_variant_html(loaded_config, i, text)
+                                for i, text in enumerate(loaded_config.love_previews)]
+    else:
+        manifest["selection"] = {"method": "life_path_number"}
+        manifest["variants"] = {str(lp): normal_variant_html(loaded_config, lp) for lp in LIFE_PATH_NUMBERS}
+    return manifest
+
+
+def write_static_previews(output_dir, config_names, seed_utc_offset):
+    """設定ごとのJSON・HTML断片とスクリプトを書き出し、書き出したファイルの一覧を返す"""
+    written = []
+    for config_name in config_names:
+        loaded_config = get_config(CONFIG_MAP[config_name])
+        manifest = build_manifest(loaded_config, seed_utc_offset)
+        variant_dir = os.path.join(output_dir, config_name)
+        os.makedirs(variant_dir, exist_ok=True)
+
+        path = os.path.join(output_dir, f"{config_name}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+        written.append(path)
+
+        variants = manifest["variants"]
+        items = variants.items() if isinstance(variants, dict) else enumerate(variants)
+        prefix = "result" if loaded_config.mode == "love" else "lp"
+        for key, fragment in items:
+            path = os.path.join(variant_dir, f"{prefix}-{key}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(fragment)
+            written.append(path)
+
+    path = os.path.join(output_dir, os.path.basename(SCRIPT_PATH))
+    shutil.copyfile(SCRIPT_PATH, path)
+    written.append(path)
+    return written
+
+
+def default_config_names():
+    """CONFIG_MAP のうち、設定ファイルが存在するもの"""
+    return [name for name, config_file in CONFIG_MAP.items() if os.path.exists(config_file)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m uranai.static_preview",
+                                     description="無料プレビューを静的なHTML/JSONとして書き出す")
+    parser.add_argument("-o", "--output", default="static_previews", help="出力先ディレクトリ")
+    parser.add_argument("--config", action="append", dest="configs", choices=sorted(CONFIG_MAP),
+                        help="設定の短縮名（省略時は存在するすべての設定）")
+    parser.add_argument("--seed-utc-offset", type=int, default=0,
+                        help="アプリのサーバーのUTCからの時差（分。既定は0＝UTC）。恋愛モードの日付のシードに使う")
+    args = parser.parse_args(argv)
+
+    written = write_static_previews(args.output, args.configs or default_config_names(), args.seed_utc_offset)
+    size = sum(os.path.getsize(path) for path in written)
+    print(f"{args.output}: {len(written)}ファイル・{size / 1024:.1f} KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
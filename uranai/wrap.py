@@ -0,0 +1,88 @@
+"""日本語テキストの折り返し（線形時間・禁則処理つき）
+
+1文字ごとに「現在の行＋1文字」全体の幅を測り直すと行の長さに対して
+二乗の計算量になる。ここでは文字ごとの送り幅をフォント・サイズ単位で
+一度だけ測ってキャッシュし、幅を足し込みながら折り返す。
+幅の測定は関数の外から渡すため、キャンバスなしで単体計測できる。
+"""
+import functools
+
+from reportlab.pdfbase import pdfmetrics
+
+# 行頭に置かない文字（閉じ括弧・句読点・小書きの仮名など）
+NOT_AT_LINE_START = frozenset(
+    "、。，．,.・：；:;？！?!゛゜ヽヾゝゞ々〻ー～〜…‥"
+    "」』）］｝〕〉》】〙〗〟’”｠»)]}"
+    "ぁぃぅぇぉっゃゅょゎゕゖァィゥェォッャュョヮヵヶ"
+    "%％"
+)
+# 行末に置かない文字（開き括弧など）
+NOT_AT_LINE_END = frozenset("「『（［｛〔〈《【〘〖〝‘“｟«([{")
+# 行末からはみ出して置いてよい文字（ぶら下げ）
+HANGING = frozenset("、。，．,.")
+
+
+class GlyphWidths(dict):
+    """1文字ごとの送り幅のキャッシュ（未測定の文字は初回アクセス時に測る）"""
+
+    def __init__(self, font_name, font_size):
+        super().__init__()
+        self.font_name = font_name
+        self.font_size = font_size
+
+    def __missing__(self, char):
+        width = self[char] = pdfmetrics.stringWidth(char, self.font_name, self.font_size)
+        return width
+
+
+@functools.lru_cache(maxsize=64)
+def glyph_widths(font_name, font_size):
+    """フォント・サイズごとに共有される GlyphWidths を返す"""
+    return GlyphWidths(font_name, font_size)
+
+
+def wrap_paragraph(text, max_width, widths):
+    """改行を含まない1段落を max_width で折り返した行のリストを返す
+
+    widths は「文字 → 送り幅」の対応（GlyphWidths など）。
+    句読点はぶら下げ、その他の行頭禁則・行末禁則は追い出しで処理する。
+    """
+    lines = []
+    start = 0
+    width = 0.0
+    i = 0
+    n = len(text)
+    while i < n:
+        char_width = widths[text[i]]
+        if width + char_width <= max_width or i == start:
+            width += char_width
+            i += 1
+            continue
+
+        # text[i] を置くとはみ出す：ここで改行する
+        if text[i] in HANGING:
+            i += 1
+        # 禁則にかからない位置まで戻る。戻した文字の幅は次の行の幅になる
+        brk = i
+        carried = 0.0
+        while brk > start and brk < n and (text[brk] in NOT_AT_LINE_START or text[brk - 1] in NOT_AT_LINE_END):
+            brk -= 1
+            carried += widths[text[brk]]
+        if brk == start:
+            # 行の中に改行できる位置がない：禁則を破って i で改行する
+            brk = i
+            carried = 0.0
+        lines.append(text[start:brk])
+        start = brk
+        width = carried
+    if start < n or not lines:
+        lines.append(text[start:])
+    return lines
+
+
+def wrap_lines(text, max_width, widths):
+    """複数段落のテキストを折り返す（改行は段落区切り、空行も1行として残す）"""
+    lines = []
+    for paragraph in text.split("\n"):
+        lines.extend(wrap_paragraph(paragraph, max_width, widths))
+    return lines
@@ -0,0 +1,185 @@
+// 無料プレビュー（静的版）のJavaScript
+//
+// python -m uranai.static_preview で書き出した <短縮名>.json を取得し、入力された
+// お名前・生年月日に合うプレビューをブラウザ側で選んで表示する（アプリのサーバーは使わない）。
+//
+// 使い方（WordPressのカスタムHTMLブロックなど）:
+//   <div class="uranai-static-preview" data-src="/wp-content/uploads/uranai-previews/love.json"
+//        data-app-url="https://（アプリのURL）/?config=love"></div>
+//   <script src="/wp-content/uploads/uranai-previews/uranai_preview.js" defer></script>
+(function () {
+    'use strict';
+
+    var MASTER_NUMBERS = [11, 22, 33];
+
+    // uranai/numerology.py の calculate_life_path_number と同じ計算
+    function sumDigits(n) {
+        while (n >= 10) {
+            n = String(n).split('').reduce(function (total, digit) { return total + Number(digit); }, 0);
+        }
+        return n;
+    }
+
+    function lifePathNumber(year, month, day) {
+        var total = sumDigits(year) + sumDigits(month) + sumDigits(day);
+        return MASTER_NUMBERS.indexOf(total) >= 0 ? total : sumDigits(total);
+    }
+
+    // MD5（uranai/love.py の診断結果の選び方に使う。UTF-8のバイト列を16進数で返す）
+    var MD5_SHIFTS = [7, 12, 17, 22, 5, 9, 14, 20, 4, 11, 16, 23, 6, 10, 15, 21];
+    var MD5_K = [];
+    for (var k = 0; k < 64; k++) {
+        MD5_K[k] = Math.floor(Math.abs(Math.sin(k + 1)) * 4294967296) >>> 0;
+    }
+
+    function md5Hex(text) {
+        var bytes = Array.prototype.slice.call(new TextEncoder().encode(text));
+        var bitLength = bytes.length * 8;
+        bytes.push(0x80);
+        while (bytes.length % 64 !== 56) {
+            bytes.push(0);
+        }
+        for (var i = 0; i < 8; i++) {
+            bytes.push(i < 4 ? (bitLength >>> (8 * i)) & 0xff : 0);
+        }
+
+        var a0 = 0x67452301, b0 = 0xefcdab89, c0 = 0x98badcfe, d0 = 0x10325476;
+        for (var offset = 0; offset < bytes.length; offset += 64) {
+            var words = [];
+            for (var w = 0; w < 16; w++) {
+                var p = offset + w * 4;
+                words[w] = (bytes[p] | (bytes[p + 1] << 8) | (bytes[p + 2] << 16) | (bytes[p + 3] << 24)) >>> 0;
+            }
+            var a = a0, b = b0, c = c0, d = d0;
+            for (var j = 0; j < 64; j++) {
+                var f, g, round = j >> 4;
+                if (round === 0) { f = (b & c) | (~b & d); g = j; }
+                else if (round === 1) { f = (d & b) | (~d & c); g = (5 * j + 1) % 16; }
+                else if (round === 2) { f = b ^ c ^ d; g = (3 * j + 5) % 16; }
+                else { f = c ^ (b | ~d); g = (7 * j) % 16; }
+                var sum = (a + f + MD5_K[j] + words[g]) >>> 0;
+                var shift = MD5_SHIFTS[round * 4 + (j % 4)];
+                a = d; d = c; c = b;
+                b = (b + ((sum << shift) | (sum >>> (32 - shift)))) >>> 0;
+            }
+            a0 = (a0 + a) >>> 0; b0 = (b0 + b) >>> 0; c0 = (c0 + c) >>> 0; d0 = (d0 + d) >>> 0;
+        }
+
+        return [a0, b0, c0, d0].map(function (word) {
+            var hex = '';
+            for (var i = 0; i < 4; i++) {
+                hex += ('0' + ((word >>> (8 * i)) & 0xff).toString(16)).slice(-2);
+            }
+            return hex;
+        }).join('');
+    }
+
+    // アプリのサーバーの時刻での今日の日付（YYYY-MM-DD）
+    function seedDate(utcOffsetMinutes) {
+        var now = new Date(Date.now() + utcOffsetMinutes * 60000);
+        return now.getUTCFullYear() + '-' + ('0' + (now.getUTCMonth() + 1)).slice(-2) + '-' +
+            ('0' + now.getUTCDate()).slice(-2);
+    }
+
+    function selectVariant(manifest, name, year, month, day) {
+        var selection = manifest.selection;
+        if (selection.method === 'life_path_number') {
+            return manifest.variants[String(lifePathNumber(year, month, day))];
+        }
+        if (!manifest.variants.length) {
+            return null;
+        }
+        // uranai/love.py の select_love_result と同じシード（お名前_年_月_日_日付）
+        var seed = [name, year, month, day, seedDate(selection.date_utc_offset_minutes)].join('_');
+        var index = BigInt('0x' + md5Hex(seed)) % BigInt(manifest.variants.length);
+        return manifest.variants[Number(index)];
+    }
+
+    function escapeHtml(text) {
+        var div = document.createElement('div');
+        div.textContent = text;
+        return div.innerHTML;
+    }
+
+    function numberSelect(label, first, last, selected) {
+        var options = '';
+        for (var n = first; n <= last; n++) {
+            options += '<option value="' + n + '"' + (n === selected ? ' selected' : '') + '>' + n + '</option>';
+        }
+        return '<label>' + label + '<select>' + options + '</select></label>';
+    }
+
+    var manifests = {};
+
+    function loadManifest(src) {
+        if (!manifests[src]) {
+            manifests[src] = fetch(src).then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.status);
+                }
+                return response.json();
+            });
+        }
+        return manifests[src];
+    }
+
+    function mount(container) {
+        var src = container.getAttribute('data-src');
+        var appUrl = container.getAttribute('data-app-url');
+        container.innerHTML =
+            '<form class="uranai-preview-form">' +
+            '<label>お名前<input type="text" maxlength="50" required></label>' +
+            '<div class="uranai-preview-dob">' +
+            numberSelect('年', 1900, 2025, 2000) + numberSelect('月', 1, 12, 1) + numberSelect('日', 1, 31, 1) +
+            '</div>' +
+            '<button type="submit">' + (container.getAttribute('data-button') || '鑑定結果の一部を見る') + '</button>' +
+            '</form><div class="uranai-preview-result" aria-live="polite"></div>';
+
+        var form = container.querySelector('form');
+        var result = container.querySelector('.uranai-preview-result');
+        form.addEventListener('submit', function (event) {
+            event.preventDefault();
+            // アプリと同じシードにするため、前後の空白は取り除かない
+            var name = form.querySelector('input').value;
+            var selects = form.querySelectorAll('select');
+            var year = Number(selects[0].value), month = Number(selects[1].value), day = Number(selects[2].value);
+            if (!name) {
+                return;
+            }
+            loadManifest(src).then(function (manifest) {
+                var variant = selectVariant(manifest, name, year, month, day);
+                if (!variant) {
+                    result.textContent = '診断結果のデータが見つかりませんでした。';
+                    return;
+                }
+                var html = '<h3 class="uranai-preview-title">' +
+                    manifest.title_template.split('{name}').join(escapeHtml(name)) +
+                    '</h3>' + variant;
+                if (appUrl) {
+                    html += '<a class="uranai-preview-cta" href="' + escapeHtml(appUrl) + '" target="_blank" rel="noopener">' +
+                        escapeHtml(container.getAttribute('data-cta') || '完全版を見る ▷') + '</a>';
+                }
+                result.innerHTML = html;
+            }).catch(function () {
+                result.textContent = 'プレビューを読み込めませんでした。時間をおいてもう一度お試しください。';
+            });
+        });
+    }
+
+    function init() {
+        Array.prototype.forEach.call(document.querySelectorAll('.uranai-static-preview'), mount);
+    }
+
+    if (typeof document === 'undefined') {
+        // ブラウザ以外（node での確認用）では表示しない
+    } else if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', init);
+    } else {
+        init();
+    }
+
+    // テスト用（node から選び方を確認する）
+    if (typeof module !== 'undefined') {
+        module.exports = { lifePathNumber: lifePathNumber, md5Hex: md5Hex, selectVariant: selectVariant };
+    }
+})();